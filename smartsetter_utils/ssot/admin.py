@@ -76,6 +76,17 @@ class OfficeAdmin(admin.ModelAdmin):
         model = SellingTransactionProxy
         fk_name = "selling_office"
 
+    stats_fields = (
+        "listing_transactions_count_12m",
+        "selling_transactions_count_12m",
+        "listing_production_12m",
+        "selling_production_12m",
+        "listing_transactions_count_all_time",
+        "selling_transactions_count_all_time",
+        "listing_production_all_time",
+        "selling_production_all_time",
+        "agents_count",
+    )
     fields = (
         "name",
         "address",
@@ -85,8 +96,8 @@ class OfficeAdmin(admin.ModelAdmin):
         "phone",
         "mls",
         "hubspot_link",
-    )
-    readonly_fields = ("hubspot_link", "mls")
+    ) + stats_fields
+    readonly_fields = ("hubspot_link", "mls") + stats_fields
     search_fields = (
         "name",
         "address",
@@ -0,0 +1,89 @@
+import csv
+import io
+import uuid
+
+from django.contrib.gis.db.models import GeometryField
+from django.db import connection
+from django.db.models import DurationField
+from django.utils.duration import duration_string
+
+
+class StagingCopyLoader:
+    """
+    Loads model instances through an UNLOGGED staging table filled with COPY,
+    then merges it into the model table with one INSERT ... SELECT.
+    Much faster than bulk_create for cold imports. Like bulk_create,
+    lifecycle hooks don't run and rows whose id already exists are skipped
+
+    with StagingCopyLoader(Transaction) as loader:
+        loader.copy(transactions)
+        created_count = loader.merge()
+    """
+
+    def __init__(self, ModelClass):
+        self.ModelClass = ModelClass
+        self.fields = ModelClass._meta.concrete_fields
+        self.columns = ", ".join(
+            connection.ops.quote_name(field.column) for field in self.fields
+        )
+        self.table_name = ModelClass._meta.db_table
+        self.staging_table_name = f"{self.table_name}_staging_{uuid.uuid4().hex[:8]}"
+        self.staged_count = 0
+
+    def __enter__(self):
+        with connection.cursor() as cursor:
+            # LIKE without INCLUDING CONSTRAINTS/INDEXES so COPY doesn't
+            # maintain indexes or fail on duplicate ids
+            cursor.execute(
+                f"CREATE UNLOGGED TABLE {self.staging_table_name} "
+                f"(LIKE {self.table_name} INCLUDING DEFAULTS)"
+            )
+        return self
+
+    def __exit__(self, *args):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {self.staging_table_name}")
+
+    def copy(self, instances):
+        buffer = io.StringIO()
+        # strings are quoted and None isn't, which is how COPY csv tells
+        # empty strings and NULLs apart
+        writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+        for instance in instances:
+            writer.writerow(
+                [self.get_copy_value(field, instance) for field in self.fields]
+            )
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {self.staging_table_name} ({self.columns}) "
+                "FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+        self.staged_count += len(instances)
+
+    def merge(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {self.table_name} ({self.columns})
+                SELECT DISTINCT ON (id) {self.columns} FROM {self.staging_table_name}
+                ORDER BY id
+                ON CONFLICT (id) DO NOTHING
+                """
+            )
+            return cursor.rowcount
+
+    @staticmethod
+    def get_copy_value(field, instance):
+        # pre_save fills auto fields like created/modified
+        value = field.get_db_prep_save(
+            field.pre_save(instance, add=True), connection=connection
+        )
+        if value is None:
+            return None
+        if isinstance(field, GeometryField):
+            return getattr(instance, field.attname).ewkt
+        if isinstance(field, DurationField):
+            return duration_string(value)
+        return value
@@ -0,0 +1,210 @@
+import functools
+import resource
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pymysql
+import pymysql.cursors
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection as default_connection
+from django.db.backends.signals import connection_created
+
+from smartsetter_utils.core import Environments
+from smartsetter_utils.ssot.models import (
+    MLS,
+    Agent,
+    Office,
+    RealityTableWatermark,
+    Transaction,
+)
+from smartsetter_utils.ssot.reality_db import RealityDBConnectionPool, override_pool
+from smartsetter_utils.ssot.synthetic import (
+    SQLiteStandInConnection,
+    change_reality_rows,
+    generate_reality_rows,
+    load_reality_rows,
+)
+from smartsetter_utils.ssot.tasks import (
+    ModelClassMapper,
+    iterate_all_create_in_batches,
+    update_or_create_items,
+)
+
+
+class QueryCounter:
+    """
+    Counts the queries Django runs on every thread's connection while active,
+    including the connections pipeline threads open
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self.lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        default_connection.execute_wrappers.append(self)
+        connection_created.connect(self.handle_connection_created)
+        return self
+
+    def __exit__(self, *args):
+        connection_created.disconnect(self.handle_connection_created)
+        default_connection.execute_wrappers.remove(self)
+
+    def handle_connection_created(self, sender, connection, **kwargs):
+        connection.execute_wrappers.append(self)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the Reality DB ingest against synthetic rows loaded into a "
+        "SQLite or scratch MySQL stand-in. Writes to the configured database "
+        "under MLS ids of its own, which are deleted afterwards"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--offices", type=int, default=1000)
+        parser.add_argument("--agents", type=int, default=10000)
+        parser.add_argument("--transactions", type=int, default=50000)
+        parser.add_argument("--mls-count", type=int, default=4)
+        parser.add_argument("--first-mls-id", type=int, default=900000)
+        parser.add_argument("--duplicate-rate", type=float, default=0.01)
+        parser.add_argument("--bad-data-rate", type=float, default=0.02)
+        parser.add_argument(
+            "--change-rate",
+            type=float,
+            default=0.1,
+            help="Share of agents and transactions changed before the update run",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--sqlite", help="SQLite stand-in path, a temporary file by default"
+        )
+        parser.add_argument(
+            "--mysql-database",
+            help="Scratch database on REALITY_DB_HOST to use instead of SQLite. "
+            "Its Reality tables are dropped and recreated",
+        )
+        parser.add_argument("--copy", action="store_true", help="Create with COPY")
+        parser.add_argument("--no-pipeline", action="store_true")
+        parser.add_argument(
+            "--keep", action="store_true", help="Keep the ingested rows"
+        )
+
+    def handle(self, *args, **options):
+        if Environments.is_prod():
+            raise CommandError("Not benchmarking against the production database")
+        if options["mysql_database"] and options["mysql_database"] == getattr(
+            settings, "REALITY_DB_NAME", None
+        ):
+            raise CommandError("The MySQL stand-in can't be the Reality DB itself")
+        mls_ids = [
+            options["first_mls_id"] + index for index in range(options["mls_count"])
+        ]
+        if MLS.objects.filter(id__in=[str(mls_id) for mls_id in mls_ids]).exists():
+            raise CommandError(f"MLS ids {mls_ids} are taken, use --first-mls-id")
+
+        rows_by_table = generate_reality_rows(
+            offices=options["offices"],
+            agents=options["agents"],
+            transactions=options["transactions"],
+            mls_ids=mls_ids,
+            duplicate_rate=options["duplicate_rate"],
+            bad_data_rate=options["bad_data_rate"],
+            seed=options["seed"],
+        )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            if options["mysql_database"]:
+                connect = functools.partial(
+                    pymysql.connect,
+                    host=settings.REALITY_DB_HOST,
+                    user=settings.REALITY_DB_USER,
+                    password=settings.REALITY_DB_PASSWORD,
+                    database=options["mysql_database"],
+                    cursorclass=pymysql.cursors.DictCursor,
+                )
+            else:
+                connect = functools.partial(
+                    SQLiteStandInConnection,
+                    options["sqlite"] or Path(temp_dir, "reality.sqlite3"),
+                )
+            with override_pool(RealityDBConnectionPool(connect=connect)) as pool:
+                MLS.objects.bulk_create(
+                    [
+                        MLS(id=str(mls_id), name=f"Benchmark {mls_id}")
+                        for mls_id in mls_ids
+                    ]
+                )
+                try:
+                    self.run_benchmark(pool, rows_by_table, mls_ids, options)
+                finally:
+                    if not options["keep"]:
+                        self.delete_benchmark_rows(mls_ids)
+
+    def run_benchmark(self, pool, rows_by_table, mls_ids, options):
+        pipelined = not options["no_pipeline"]
+        with pool.connection() as stand_in_connection:
+            load_reality_rows(stand_in_connection, rows_by_table)
+        for model_class_id in ModelClassMapper.ingest_order:
+            ModelClass = ModelClassMapper.get_model_class_from_id(model_class_id)
+            self.measure(
+                "create",
+                ModelClass,
+                len(rows_by_table[ModelClass.reality_table_name]),
+                lambda: [
+                    iterate_all_create_in_batches(
+                        model_class_id,
+                        mls_id=mls_id,
+                        copy=options["copy"],
+                        pipelined=pipelined,
+                    )
+                    for mls_id in mls_ids
+                ],
+            )
+
+        rows_by_table = change_reality_rows(
+            rows_by_table, options["change_rate"], seed=options["seed"]
+        )
+        with pool.connection() as stand_in_connection:
+            load_reality_rows(stand_in_connection, rows_by_table)
+        for model_class_id in ModelClassMapper.ingest_order:
+            ModelClass = ModelClassMapper.get_model_class_from_id(model_class_id)
+            self.measure(
+                "update",
+                ModelClass,
+                len(rows_by_table[ModelClass.reality_table_name]),
+                lambda: [
+                    update_or_create_items(
+                        model_class_id, full=True, mls_id=mls_id, pipelined=pipelined
+                    )
+                    for mls_id in mls_ids
+                ],
+            )
+
+    def measure(self, stage, ModelClass, row_count, ingest):
+        with QueryCounter() as query_counter:
+            start_time = time.perf_counter()
+            ingest()
+            seconds = time.perf_counter() - start_time
+        # ru_maxrss is in KiB on Linux
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        self.stdout.write(
+            f"{stage:<6} {ModelClass.__name__:<11} {row_count:>9} rows "
+            f"{seconds:8.2f}s {row_count / seconds:9.0f} rows/s "
+            f"{query_counter.count / max(row_count, 1):7.3f} queries/row "
+            f"peak RSS {peak_rss:7.1f} MiB"
+        )
+
+    def delete_benchmark_rows(self, mls_ids):
+        mls_ids = [str(mls_id) for mls_id in mls_ids]
+        for ModelClass in (Transaction, Agent, Office):
+            ModelClass.objects.filter(mls_id__in=mls_ids).delete()
+        RealityTableWatermark.objects.filter(shard__in=mls_ids).delete()
+        MLS.objects.filter(id__in=mls_ids).delete()
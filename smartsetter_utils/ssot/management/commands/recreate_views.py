@@ -20,5 +20,7 @@ class Command(BaseCommand):
                     WHERE mls_id = '{mls.id}'
                     """
                 )
+            mls.create_agent_materialized_view_unique_index()
+            mls.create_agent_materialized_view_indexes()
 
         self.stdout.write(self.style.SUCCESS("All views recreated"))
\ No newline at end of file
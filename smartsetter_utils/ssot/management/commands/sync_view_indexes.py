@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from smartsetter_utils.ssot.models.mls import MLS
+
+
+class Command(BaseCommand):
+    help = (
+        "Create and drop indexes of all agent materialized views to match "
+        "MLS.AGENT_MATERIALIZED_VIEW_INDEXES"
+    )
+
+    def handle(self, *args, **kwargs):
+        MLS.objects.sync_agent_materialized_view_indexes()
+        self.stdout.write(self.style.SUCCESS("All view indexes synced"))
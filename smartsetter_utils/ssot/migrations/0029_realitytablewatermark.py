@@ -0,0 +1,51 @@
+# Generated by Django 4.2.11 on 2026-10-18 09:12
+
+import django.utils.timezone
+import model_utils.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ssot", "0028_raw_data_ssot_models"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RealityTableWatermark",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created",
+                    model_utils.fields.AutoCreatedField(
+                        default=django.utils.timezone.now,
+                        editable=False,
+                        verbose_name="created",
+                    ),
+                ),
+                (
+                    "modified",
+                    model_utils.fields.AutoLastModifiedField(
+                        default=django.utils.timezone.now,
+                        editable=False,
+                        verbose_name="modified",
+                    ),
+                ),
+                ("table_name", models.CharField(max_length=64, unique=True)),
+                ("field_name", models.CharField(max_length=64)),
+                ("value", models.CharField(blank=True, max_length=64, null=True)),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.11 on 2026-10-18 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ssot", "0029_realitytablewatermark"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="realitytablewatermark",
+            name="shard",
+            field=models.CharField(blank=True, default="", max_length=32),
+        ),
+        migrations.AlterField(
+            model_name="realitytablewatermark",
+            name="table_name",
+            field=models.CharField(max_length=64),
+        ),
+        migrations.AlterUniqueTogether(
+            name="realitytablewatermark",
+            unique_together={("table_name", "shard")},
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.11 on 2026-10-18 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ssot", "0030_realitytablewatermark_shard"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="agent",
+            name="source_hash",
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name="office",
+            name="source_hash",
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="source_hash",
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+    ]
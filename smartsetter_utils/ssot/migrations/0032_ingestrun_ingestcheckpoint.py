@@ -0,0 +1,112 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:27
+
+import django.db.models.deletion
+import django.utils.timezone
+import model_utils.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ssot", "0031_agent_source_hash_office_source_hash_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IngestRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created",
+                    model_utils.fields.AutoCreatedField(
+                        default=django.utils.timezone.now,
+                        editable=False,
+                        verbose_name="created",
+                    ),
+                ),
+                (
+                    "modified",
+                    model_utils.fields.AutoLastModifiedField(
+                        default=django.utils.timezone.now,
+                        editable=False,
+                        verbose_name="modified",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("create", "Initial import"),
+                            ("pull", "Pull updates"),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                ("full", models.BooleanField(default=False)),
+                ("copy", models.BooleanField(default=False)),
+                ("sharded", models.BooleanField(default=False)),
+                (
+                    "expected_checkpoint_count",
+                    models.PositiveIntegerField(blank=True, null=True),
+                ),
+                ("finished", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="IngestCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created",
+                    model_utils.fields.AutoCreatedField(
+                        default=django.utils.timezone.now,
+                        editable=False,
+                        verbose_name="created",
+                    ),
+                ),
+                (
+                    "modified",
+                    model_utils.fields.AutoLastModifiedField(
+                        default=django.utils.timezone.now,
+                        editable=False,
+                        verbose_name="modified",
+                    ),
+                ),
+                ("table_name", models.CharField(max_length=64)),
+                ("shard", models.CharField(blank=True, default="", max_length=32)),
+                ("last_key", models.JSONField(blank=True, null=True)),
+                ("completed", models.BooleanField(default=False)),
+                (
+                    "run",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="checkpoints",
+                        to="ssot.ingestrun",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("run", "table_name", "shard")},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-18 13:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ssot", "0032_ingestrun_ingestcheckpoint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ingestcheckpoint",
+            name="duplicate_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
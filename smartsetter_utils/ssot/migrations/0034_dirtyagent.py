@@ -0,0 +1,23 @@
+# Generated by Django 4.2.11 on 2026-10-18 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ssot", "0033_ingestcheckpoint_duplicate_count"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DirtyAgent",
+            fields=[
+                (
+                    "agent_id",
+                    models.CharField(max_length=32, primary_key=True, serialize=False),
+                ),
+                ("marked", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
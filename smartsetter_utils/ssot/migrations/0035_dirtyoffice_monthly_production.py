@@ -0,0 +1,107 @@
+# Generated by Django 4.2.11 on 2026-10-18 15:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ssot", "0034_dirtyagent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DirtyOffice",
+            fields=[
+                ("marked", models.DateTimeField(auto_now=True)),
+                (
+                    "office_id",
+                    models.CharField(max_length=256, primary_key=True, serialize=False),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="AgentMonthlyProduction",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "role",
+                    models.CharField(
+                        choices=[
+                            ("listing", "listing"),
+                            ("colisting", "colisting"),
+                            ("selling", "selling"),
+                            ("coselling", "coselling"),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                ("month", models.DateField(blank=True, null=True)),
+                ("transactions_count", models.PositiveIntegerField(default=0)),
+                ("production", models.PositiveBigIntegerField(default=0)),
+                (
+                    "agent",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="monthly_production",
+                        to="ssot.agent",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("agent", "role", "month")},
+            },
+        ),
+        migrations.CreateModel(
+            name="OfficeMonthlyProduction",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "role",
+                    models.CharField(
+                        choices=[
+                            ("listing", "listing"),
+                            ("colisting", "colisting"),
+                            ("selling", "selling"),
+                            ("coselling", "coselling"),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                ("month", models.DateField(blank=True, null=True)),
+                ("transactions_count", models.PositiveIntegerField(default=0)),
+                ("production", models.PositiveBigIntegerField(default=0)),
+                (
+                    "office",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="monthly_production",
+                        to="ssot.office",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("office", "role", "month")},
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.11 on 2026-10-18 15:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ssot", "0035_dirtyoffice_monthly_production"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="office",
+            name="listing_transactions_count_12m",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="office",
+            name="selling_transactions_count_12m",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="office",
+            name="listing_production_12m",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="office",
+            name="selling_production_12m",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="office",
+            name="listing_transactions_count_all_time",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="office",
+            name="selling_transactions_count_all_time",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="office",
+            name="listing_production_all_time",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="office",
+            name="selling_production_all_time",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="office",
+            name="agents_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,14 @@
+# Generated by Django 4.2.11 on 2026-10-18 16:40
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # the trigram indexes of the agent materialized views need pg_trgm
+
+    dependencies = [
+        ("ssot", "0036_office_cached_stats"),
+    ]
+
+    operations = [TrigramExtension()]
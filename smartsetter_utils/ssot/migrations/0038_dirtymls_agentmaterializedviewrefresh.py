@@ -0,0 +1,72 @@
+# Generated by Django 4.2.11 on 2026-10-18 17:25
+
+import django.db.models.deletion
+import django.utils.timezone
+import model_utils.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ssot", "0037_trigram_extension"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DirtyMLS",
+            fields=[
+                ("marked", models.DateTimeField(auto_now=True)),
+                (
+                    "mls_id",
+                    models.CharField(max_length=32, primary_key=True, serialize=False),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="AgentMaterializedViewRefresh",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created",
+                    model_utils.fields.AutoCreatedField(
+                        default=django.utils.timezone.now,
+                        editable=False,
+                        verbose_name="created",
+                    ),
+                ),
+                (
+                    "modified",
+                    model_utils.fields.AutoLastModifiedField(
+                        default=django.utils.timezone.now,
+                        editable=False,
+                        verbose_name="modified",
+                    ),
+                ),
+                ("duration", models.DurationField()),
+                ("row_count", models.PositiveIntegerField()),
+                (
+                    "mls",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="agent_materialized_view_refreshes",
+                        to="ssot.mls",
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+    ]
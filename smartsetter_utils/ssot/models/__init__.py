@@ -3,6 +3,19 @@ from .agent_office_movement import AgentOfficeMovement  # noqa: F401
 from .brand import Brand  # noqa: F401
 from .materialized_view_agent import *  # noqa: F401, F403
 from .mls import MLS  # noqa: F401
+from .monthly_production import (  # noqa: F401
+    AgentMonthlyProduction,
+    OfficeMonthlyProduction,
+)
 from .office import Office  # noqa: F401
+from .sync_state import (  # noqa: F401
+    AgentMaterializedViewRefresh,
+    DirtyAgent,
+    DirtyMLS,
+    DirtyOffice,
+    IngestCheckpoint,
+    IngestRun,
+    RealityTableWatermark,
+)
 from .transaction import Transaction  # noqa: F401
-from .zipcode import Zipcode  # noqa: F401
+from .zipcode import Zipcode, ZipcodeLocation  # noqa: F401
@@ -2,13 +2,12 @@ import re
 from decimal import Decimal
 from typing import Any, List, Literal, Optional, TypedDict
 
-import more_itertools
 import urllib3.exceptions
 from dateutil.relativedelta import relativedelta
 from django.contrib.gis.db import models
 from django.core import validators
-from django.db.models import Count, F, Max, Min, Q
-from django.db.models.functions import Cast, Coalesce, Greatest
+from django.db.models import F, Q
+from django.db.models.functions import Cast, Greatest
 from django_lifecycle import AFTER_CREATE, hook
 from django_lifecycle.models import LifecycleModelMixin
 from hubspot.crm.associations.v4.exceptions import (
@@ -25,20 +24,23 @@ from model_utils.choices import Choices
 from smartsetter_utils.core import Environments, run_task_in_transaction
 from smartsetter_utils.geo_utils import create_geometry_from_geojson
 from smartsetter_utils.hubspot.utils import get_hubspot_client
-from smartsetter_utils.ssot.data import member_type_patterns, security_class_patterns
 from smartsetter_utils.ssot.models.base_models import (
     AgentOfficeCommonFields,
     CommonFields,
     RealityDBBase,
+    RealityForeignKeyResolver,
 )
 from smartsetter_utils.ssot.models.brand import Brand
 from smartsetter_utils.ssot.models.mls import MLS
 from smartsetter_utils.ssot.models.office import Office
 from smartsetter_utils.ssot.models.querysets import CommonQuerySet
+from smartsetter_utils.ssot.models.sync_state import DirtyMLS
 from smartsetter_utils.ssot.models.utils import get_hubspot_timestamp_from_iso_date
 from smartsetter_utils.ssot.utils import (
     apply_filter_to_queryset,
     get_brand_fixed_office_name,
+    member_type_matcher,
+    security_class_matcher,
 )
 
 
@@ -52,90 +54,31 @@ class AgentQuerySet(CommonQuerySet):
             / Greatest(F("total_transactions_count"), 1),
         )
 
+    def update_cached_stats(self):
+        from smartsetter_utils.ssot.models.agent_stats import update_agent_cached_stats
+        from smartsetter_utils.ssot.models.monthly_production import (
+            AgentMonthlyProduction,
+        )
+
+        update_agent_cached_stats(self)
+        AgentMonthlyProduction.rebuild(self)
+        self.update_roles()
+        # the stats are part of the MLS agent materialized views
+        DirtyMLS.mark(self.order_by().values_list("mls_id", flat=True).distinct())
+
     def update_cached_fields(self):
-        from smartsetter_utils.ssot.models.agent import Agent
-        from smartsetter_utils.ssot.models.transaction import Transaction
-
-        for agent_group in more_itertools.chunked(self.iterator(), 1000):
-            for agent in agent_group:
-                # stats
-                # can't update using F expressions: Joined field references are not permitted in this query
-                agent.listing_transactions_count = (
-                    agent.listing_transactions.filter_12m().count()
-                    + (agent.colisting_transactions.filter_12m().count() / 2)
-                )
-                agent.selling_transactions_count = (
-                    agent.selling_transactions.filter_12m().count()
-                    + (agent.coselling_transactions.filter_12m().count() / 2)
-                )
-                agent.total_transactions_count = (
-                    agent.listing_transactions_count + agent.selling_transactions_count
-                )
-                agent.listing_production = (
-                    agent.listing_transactions.filter_12m().production()
-                    + (agent.colisting_transactions.filter_12m().production() / 2)
-                )
-                agent.selling_production = (
-                    agent.selling_transactions.filter_12m().production()
-                    + (agent.coselling_transactions.filter_12m().production() / 2)
-                )
-                agent.total_production = (
-                    agent.listing_production + agent.selling_production
-                )
-                # tenure
-                sold_transactions = Transaction.objects.filter_listing_or_selling(
-                    agent
-                ).sold()
-                agent.tenure_start_date = sold_transactions.aggregate(
-                    tenure_start_date=Min(
-                        Coalesce("listing_contract_date", "closed_date")
-                    )
-                )["tenure_start_date"]
-                agent.tenure_end_date = sold_transactions.aggregate(
-                    tenure_end_date=Max(
-                        Coalesce("listing_contract_date", "closed_date")
-                    )
-                )["tenure_end_date"]
-                if agent.tenure_start_date:
-                    agent.tenure = agent.tenure_end_date - agent.tenure_start_date
-                    agent.years_in_business = agent.tenure.days / 365
-                # most transacted city
-                most_transacted_city_tx = (
-                    Transaction.objects.filter_listing_or_selling(agent)
-                    .values("city")
-                    .annotate(tx_count_per_city=Count("city"))
-                    .order_by("-tx_count_per_city")
-                    .values("city")
-                    .first()
-                )
-                if most_transacted_city_tx:
-                    agent.most_transacted_city = most_transacted_city_tx["city"]
-                # last activity date
-                agent.last_activity_date = (
-                    Transaction.objects.filter_listing_or_selling(agent).aggregate(
-                        max_listing_contract_date=Max("listing_contract_date")
-                    )["max_listing_contract_date"]
-                )
-                agent.assign_role()
-
-            Agent.objects.bulk_update(
-                agent_group,
-                [
-                    "listing_transactions_count",
-                    "selling_transactions_count",
-                    "total_transactions_count",
-                    "listing_production",
-                    "selling_production",
-                    "total_production",
-                    "tenure_start_date",
-                    "tenure_end_date",
-                    "tenure",
-                    "years_in_business",
-                    "most_transacted_city",
-                    "last_activity_date",
-                    "role",
-                ],
-            )
+        self.update_cached_stats()
+
+    def update_roles(self):
+        from smartsetter_utils.ssot.models.agent_stats import update_agent_roles
+
+        # roles depend on total_transactions_count, so this runs after the stats
+        update_agent_roles(self)
+
+    def get_scores(self):
+        from smartsetter_utils.ssot.models.scores import get_scores
+
+        return get_scores(self)
 
     def filter_by_portal_filters(self, filters):
         type AllowedFilters = Literal[
@@ -219,6 +162,19 @@ class AbstractAgent(
         abstract = True
 
     reality_table_name = "tblAgents"
+    reality_key_fields = ("AgentID",)
+    reality_source_fields = (
+        "AgentName",
+        "Email",
+        "OfficeID",
+        "OfficeName",
+        "YIB",
+        "Address",
+        "City",
+        "Zipcode",
+        "State",
+        "AgentPhone",
+    )
 
     ROLE_CHOICES = Choices(("agent", "Agent"), ("broker", "Broker"), ("other", "Other"))
 
@@ -296,6 +252,8 @@ class AbstractAgent(
 
     objects = AgentQuerySet.as_manager()
 
+    has_creation_hooks = True
+
     def __str__(self):
         return self.name
 
@@ -329,33 +287,28 @@ class AbstractAgent(
             if self.total_transactions_count > 0:
                 self.role = self.ROLE_CHOICES.agent
             else:
-
-                def is_role_other(value: str, patterns):
-                    if value:
-                        value_normalized = value.lower().strip()
-                        for pattern in patterns:
-                            if value_normalized in pattern:
-                                return True
-                    return False
-
                 #member_type = raw_data.get("MemberType")
                 #security_class = raw_data.get("MemberMlsSecurityClass")
                 member_type = self.member_type 
                 security_class = self.member_mlssecurity_class
-                if is_role_other(member_type, member_type_patterns) or is_role_other(
-                    security_class, security_class_patterns
-                ):
+                if member_type_matcher.matches(
+                    member_type
+                ) or security_class_matcher.matches(security_class):
                     self.role = self.ROLE_CHOICES.other
                 else:
                     self.role = self.ROLE_CHOICES.agent
 
     @classmethod
-    def from_reality_dict(cls, reality_dict):
+    def from_reality_dict(cls, reality_dict, fk_resolver=None):
         from smartsetter_utils.ssot.models.agent import Agent
 
+        property_dict = cls.get_property_dict_from_reality_dict(
+            reality_dict, fk_resolver
+        )
         return Agent(
             id=cls.get_id_from_reality_dict(reality_dict),
-            **cls.get_property_dict_from_reality_dict(reality_dict),
+            source_hash=cls.get_reality_hash(property_dict),
+            **property_dict,
         )
 
     @staticmethod
@@ -363,20 +316,28 @@ class AbstractAgent(
         return f"{reality_dict[agent_id_field]}__{reality_dict['MLSID']}"
 
     @staticmethod
-    def get_property_dict_from_reality_dict(reality_dict):
+    def get_property_dict_from_reality_dict(reality_dict, fk_resolver=None):
+        fk_resolver = fk_resolver or RealityForeignKeyResolver()
         return {
             "name": reality_dict["AgentName"].title(),
             "email": reality_dict["Email"].lower(),
-            "office": Office.objects.get_by_id_or_none(
-                Office.get_id_from_reality_dict(reality_dict)
+            "office_id": fk_resolver.resolve(
+                Office, Office.get_id_from_reality_dict(reality_dict)
             ),
             "office_name": get_brand_fixed_office_name(reality_dict["OfficeName"]),
             "years_in_business": reality_dict["YIB"],
             **AgentOfficeCommonFields.get_common_properties_from_reality_dict(
-                reality_dict, "AgentPhone", "Zipcode"
+                reality_dict, "AgentPhone", "Zipcode", fk_resolver
             ),
         }
 
+    @staticmethod
+    def get_reality_foreign_keys(reality_dict):
+        return [
+            (MLS, reality_dict["MLSID"]),
+            (Office, Office.get_id_from_reality_dict(reality_dict)),
+        ]
+
     def get_hubspot_dict(self):
         mls_modification_timestamp = self.raw_mls_modification_timestamp #self.raw_data.get("RawMlsModificationTimestamp")
         return {
@@ -499,17 +460,21 @@ class AbstractAgent(
             pass
 
     def get_hubspot_stats_dict(self):
-        listing_transactions_12m = self.listing_transactions.filter_12m()
-        listing_production_12m = listing_transactions_12m.production()
-        selling_transactions_12m = self.selling_transactions.filter_12m()
-        selling_production_12m = selling_transactions_12m.production()
+        from smartsetter_utils.ssot.models.monthly_production import (
+            AgentMonthlyProduction,
+        )
+        from smartsetter_utils.ssot.models.transaction import get_12m_start_date
+
+        stats_12m = AgentMonthlyProduction.get_stats(self.id, get_12m_start_date())
+        listing_production_12m = stats_12m["listing"]["production"]
+        selling_production_12m = stats_12m["selling"]["production"]
 
         return {
             "sales_volume__12m_": listing_production_12m + selling_production_12m,
             "sales_listing_volume__12m_": listing_production_12m,
-            "sales_listing_count__12m_": listing_transactions_12m.count(),
+            "sales_listing_count__12m_": stats_12m["listing"]["count"],
             "sales_buying_volume__12m_": selling_production_12m,
-            "sales_buying_count__12m_": selling_transactions_12m.count(),
+            "sales_buying_count__12m_": stats_12m["selling"]["count"],
             "sales_volume__all_time_": self.listing_production
             + self.selling_production,
             "sales_count__all_time_": self.listing_transactions_count
@@ -1,5 +1,46 @@
+from django.contrib.gis.db import models
+
 from smartsetter_utils.ssot.models.abstract_agent import AbstractAgent
+from smartsetter_utils.ssot.models.sync_state import DirtyAgent, DirtyMLS, DirtyOffice
 
 
 class Agent(AbstractAgent):
-    pass
+    # not on AbstractAgent so the MLS materialized views, created with
+    # SELECT * before this column existed, don't need to be recreated
+    source_hash = models.CharField(max_length=32, null=True, blank=True)
+
+    @classmethod
+    def handle_bulk_upserted(cls, previous_agents, agents, update_fields):
+        # an agent's role depends on the broker keys of its office, so moving
+        # offices needs the same recomputation as a changed transaction, and
+        # changes the headcount of both offices
+        moved_agents = [
+            agent
+            for agent in agents
+            if agent.office_id != previous_agents[agent.id].office_id
+        ]
+        DirtyAgent.mark(agent.id for agent in moved_agents)
+        DirtyMLS.mark(agent.mls_id for agent in agents)
+        cls.mark_office_headcount_changed(
+            office_id
+            for agent in moved_agents
+            for office_id in (agent.office_id, previous_agents[agent.id].office_id)
+        )
+
+    @classmethod
+    def handle_bulk_created(cls, agents):
+        # new agents have no cached stats or role yet
+        DirtyAgent.mark(agent.id for agent in agents)
+        DirtyMLS.mark(agent.mls_id for agent in agents)
+        cls.mark_office_headcount_changed(agent.office_id for agent in agents)
+
+    @classmethod
+    def mark_office_headcount_changed(cls, office_ids):
+        # the headcount feeds the office size score of every agent of the office
+        office_ids = set(filter(None, office_ids))
+        if not office_ids:
+            return
+        DirtyOffice.mark(office_ids)
+        DirtyAgent.mark(
+            cls.objects.filter(office_id__in=office_ids).values_list("id", flat=True)
+        )
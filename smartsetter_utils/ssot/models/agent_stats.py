@@ -0,0 +1,202 @@
+import string
+
+from django.db import connection
+
+from smartsetter_utils.ssot.models.office import Office
+from smartsetter_utils.ssot.models.transaction import Transaction, get_12m_start_date
+from smartsetter_utils.ssot.utils import member_type_matcher, security_class_matcher
+
+# every {placeholder} is a table name, every %s a parameter
+AGENT_CACHED_STATS_SQL = """
+WITH scoped_agents AS (
+    {scoped_agents}
+),
+agent_transactions AS (
+    -- one row per role an agent has on a transaction, with the role's share
+    -- of it: co-listing and co-selling agents get half credit
+    SELECT
+        listing_agent_id AS agent_id, id AS transaction_id,
+        1.0 AS listing_share, 0.0 AS selling_share, TRUE AS is_principal,
+        closed_date, listing_contract_date, sold_price, city
+    FROM {transaction_table}
+    WHERE listing_agent_id IN (SELECT id FROM scoped_agents)
+    UNION ALL
+    SELECT
+        colisting_agent_id, id, 0.5, 0.0, FALSE,
+        closed_date, listing_contract_date, sold_price, city
+    FROM {transaction_table}
+    WHERE colisting_agent_id IN (SELECT id FROM scoped_agents)
+    UNION ALL
+    SELECT
+        selling_agent_id, id, 0.0, 1.0, TRUE,
+        closed_date, listing_contract_date, sold_price, city
+    FROM {transaction_table}
+    WHERE selling_agent_id IN (SELECT id FROM scoped_agents)
+    UNION ALL
+    SELECT
+        coselling_agent_id, id, 0.0, 0.5, FALSE,
+        closed_date, listing_contract_date, sold_price, city
+    FROM {transaction_table}
+    WHERE coselling_agent_id IN (SELECT id FROM scoped_agents)
+),
+stats_12m AS (
+    SELECT
+        agent_id,
+        SUM(listing_share) AS listing_count,
+        SUM(selling_share) AS selling_count,
+        COALESCE(SUM(listing_share * sold_price), 0) AS listing_production,
+        COALESCE(SUM(selling_share * sold_price), 0) AS selling_production
+    FROM agent_transactions
+    WHERE closed_date >= %s
+    GROUP BY agent_id
+),
+principal_transactions AS (
+    -- transactions the agent listed or sold, once even if they did both
+    SELECT DISTINCT
+        agent_id, transaction_id, closed_date, listing_contract_date, city
+    FROM agent_transactions
+    WHERE is_principal
+),
+activity AS (
+    SELECT
+        agent_id,
+        MIN(COALESCE(listing_contract_date, closed_date))
+            FILTER (WHERE closed_date IS NOT NULL) AS tenure_start_date,
+        MAX(COALESCE(listing_contract_date, closed_date))
+            FILTER (WHERE closed_date IS NOT NULL) AS tenure_end_date,
+        MAX(listing_contract_date) AS last_activity_date
+    FROM principal_transactions
+    GROUP BY agent_id
+),
+cities AS (
+    SELECT DISTINCT ON (agent_id) agent_id, city
+    FROM principal_transactions
+    GROUP BY agent_id, city
+    ORDER BY agent_id, COUNT(city) DESC, city
+)
+UPDATE {agent_table} AS agent
+SET
+    listing_transactions_count = TRUNC(COALESCE(stats_12m.listing_count, 0)),
+    selling_transactions_count = TRUNC(COALESCE(stats_12m.selling_count, 0)),
+    total_transactions_count = TRUNC(
+        COALESCE(stats_12m.listing_count + stats_12m.selling_count, 0)
+    ),
+    listing_production = TRUNC(COALESCE(stats_12m.listing_production, 0)),
+    selling_production = TRUNC(COALESCE(stats_12m.selling_production, 0)),
+    total_production = TRUNC(
+        COALESCE(stats_12m.listing_production + stats_12m.selling_production, 0)
+    ),
+    tenure_start_date = activity.tenure_start_date,
+    tenure_end_date = activity.tenure_end_date,
+    tenure = CASE
+        WHEN activity.tenure_start_date IS NULL THEN agent.tenure
+        ELSE (activity.tenure_end_date - activity.tenure_start_date) * INTERVAL '1 day'
+    END,
+    years_in_business = CASE
+        WHEN activity.tenure_start_date IS NULL THEN agent.years_in_business
+        ELSE (activity.tenure_end_date - activity.tenure_start_date) / 365
+    END,
+    most_transacted_city = CASE
+        WHEN cities.agent_id IS NULL THEN agent.most_transacted_city
+        ELSE cities.city
+    END,
+    last_activity_date = activity.last_activity_date
+FROM scoped_agents
+LEFT JOIN stats_12m ON stats_12m.agent_id = scoped_agents.id
+LEFT JOIN activity ON activity.agent_id = scoped_agents.id
+LEFT JOIN cities ON cities.agent_id = scoped_agents.id
+WHERE agent.id = scoped_agents.id
+"""
+
+# AbstractAgent.assign_role as SQL: the matchers' `value.lower().strip() in
+# pattern` becomes STRPOS() over the same patterns
+AGENT_ROLES_SQL = """
+UPDATE {agent_table} AS agent
+SET role = roles.role
+FROM (
+    SELECT
+        scoped_agent.id,
+        CASE
+            WHEN scoped_agent.id IN (
+                office.office_broker_key,
+                office.office_manager_key,
+                office.office_broker_mls_id
+            ) THEN %s
+            WHEN scoped_agent.total_transactions_count > 0 THEN %s
+            WHEN EXISTS (
+                SELECT FROM UNNEST(%s::text[]) AS pattern
+                WHERE STRPOS(pattern, normalized.member_type) > 0
+            ) OR EXISTS (
+                SELECT FROM UNNEST(%s::text[]) AS pattern
+                WHERE STRPOS(pattern, normalized.security_class) > 0
+            ) THEN %s
+            ELSE %s
+        END AS role
+    FROM {agent_table} AS scoped_agent
+    LEFT JOIN {office_table} AS office ON office.id = scoped_agent.office_id
+    CROSS JOIN LATERAL (
+        -- null for null or empty values, which never match
+        SELECT
+            LOWER(BTRIM(NULLIF(scoped_agent.member_type, ''), %s)) AS member_type,
+            LOWER(BTRIM(NULLIF(scoped_agent.member_mlssecurity_class, ''), %s))
+                AS security_class
+    ) AS normalized
+    WHERE scoped_agent.id IN ({scoped_agents})
+) AS roles
+WHERE agent.id = roles.id AND agent.role IS DISTINCT FROM roles.role
+"""
+
+
+def update_agent_cached_stats(agent_queryset):
+    """
+    Recomputes the cached stats of the agents in agent_queryset with one
+    UPDATE ... FROM over GROUP BY subqueries of the transactions table,
+    instead of a dozen queries per agent. Counts and production are
+    truncated like the per-agent version assigning them to integer fields did
+    """
+    scoped_agents_sql, scoped_agents_params = (
+        agent_queryset.order_by().values("id").query.sql_with_params()
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            AGENT_CACHED_STATS_SQL.format(
+                scoped_agents=scoped_agents_sql,
+                transaction_table=Transaction._meta.db_table,
+                agent_table=agent_queryset.model._meta.db_table,
+            ),
+            [*scoped_agents_params, get_12m_start_date()],
+        )
+        return cursor.rowcount
+
+
+def update_agent_roles(agent_queryset):
+    """
+    Assigns the role of the agents in agent_queryset like assign_role does,
+    with one UPDATE joined to their offices' broker keys that only writes
+    the roles that changed
+    """
+    scoped_agents_sql, scoped_agents_params = (
+        agent_queryset.order_by().values("id").query.sql_with_params()
+    )
+    ROLE_CHOICES = agent_queryset.model.ROLE_CHOICES
+    with connection.cursor() as cursor:
+        cursor.execute(
+            AGENT_ROLES_SQL.format(
+                agent_table=agent_queryset.model._meta.db_table,
+                office_table=Office._meta.db_table,
+                scoped_agents=scoped_agents_sql,
+            ),
+            [
+                ROLE_CHOICES.broker,
+                ROLE_CHOICES.agent,
+                member_type_matcher.patterns,
+                security_class_matcher.patterns,
+                ROLE_CHOICES.other,
+                ROLE_CHOICES.agent,
+                # what str.strip() strips
+                string.whitespace,
+                string.whitespace,
+                *scoped_agents_params,
+            ],
+        )
+        return cursor.rowcount
@@ -1,9 +1,13 @@
+import hashlib
+import json
+
+from django.conf import settings
 from django.contrib.gis.db import models
 from model_utils.choices import Choices
 from model_utils.models import TimeStampedModel
 
 from smartsetter_utils.ssot.models.querysets import CommonFieldsQuerySet, CommonQuerySet
-from smartsetter_utils.ssot.utils import format_phone
+from smartsetter_utils.ssot.utils import phone_normalizer
 
 
 class CommonFields(models.Model):
@@ -55,16 +59,20 @@ class AgentOfficeCommonFields(TimeStampedModel):
 
     @staticmethod
     def get_common_properties_from_reality_dict(
-        reality_dict, phone_field_name, zipcode_field_name="PostalCode"
+        reality_dict,
+        phone_field_name,
+        zipcode_field_name="PostalCode",
+        fk_resolver=None,
     ):
         from smartsetter_utils.ssot.models.mls import MLS
 
+        fk_resolver = fk_resolver or RealityForeignKeyResolver()
         return {
             "address": reality_dict["Address"],
             "city": reality_dict["City"],
             "zipcode": reality_dict[zipcode_field_name],
-            "phone": format_phone(reality_dict[phone_field_name]),
-            "mls": MLS.objects.get_by_id_or_none(id=reality_dict["MLSID"]),
+            "phone": phone_normalizer.normalize(reality_dict[phone_field_name]),
+            "mls_id": fk_resolver.resolve(MLS, reality_dict["MLSID"]),
             "state": reality_dict["State"],
         }
 
@@ -75,9 +83,49 @@ class AgentOfficeCommonFields(TimeStampedModel):
 
 class RealityDBBase:
     reality_table_name = None
+    # columns identifying a row together with MLSID, used to page and
+    # checkpoint through a table in a stable order
+    reality_key_fields = ()
+    # columns read by get_property_dict_from_reality_dict, the only ones
+    # selected from the Reality table
+    reality_source_fields = ()
+    # date column compared against MLS.data_available_until, if any
+    reality_date_field = None
+    # column used for delta syncs, e.g. a modification timestamp or an
+    # auto-increment key. Can be overridden per table with the
+    # REALITY_DB_WATERMARK_FIELDS setting
+    reality_watermark_field = None
+    # whether new rows need save() for their lifecycle hooks to run, rather
+    # than being bulk inserted by the ingest. hooks that only geocode don't
+    # count, the ingest geocodes its new rows in one batch afterwards
+    has_creation_hooks = False
+
+    @classmethod
+    def get_reality_key_fields(cls, sharded=False):
+        # shards are already filtered by MLSID
+        return cls.reality_key_fields if sharded else ("MLSID", *cls.reality_key_fields)
+
+    @classmethod
+    def get_reality_select_fields(cls):
+        return list(
+            dict.fromkeys(
+                [
+                    "MLSID",
+                    *cls.reality_key_fields,
+                    *cls.reality_source_fields,
+                    *filter(None, [cls.get_reality_watermark_field()]),
+                ]
+            )
+        )
+
+    @classmethod
+    def get_reality_watermark_field(cls):
+        return getattr(settings, "REALITY_DB_WATERMARK_FIELDS", {}).get(
+            cls.reality_table_name, cls.reality_watermark_field
+        )
 
     @classmethod
-    def from_reality_dict(cls, reality_dict):
+    def from_reality_dict(cls, reality_dict, fk_resolver=None):
         raise NotImplementedError
 
     @staticmethod
@@ -85,5 +133,80 @@ class RealityDBBase:
         raise NotImplementedError
 
     @staticmethod
-    def get_property_dict_from_reality_dict(reality_dict):
+    def get_property_dict_from_reality_dict(reality_dict, fk_resolver=None):
+        raise NotImplementedError
+
+    @staticmethod
+    def get_reality_hash(property_dict):
+        """
+        Stable hash of the fields derived from a Reality row, stored in
+        source_hash to skip rewriting rows that didn't change
+        """
+        return hashlib.md5(
+            json.dumps(property_dict, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    @staticmethod
+    def get_reality_foreign_keys(reality_dict):
+        """
+        (model class, id) pairs of the rows referenced by reality_dict
+        """
         raise NotImplementedError
+
+    @classmethod
+    def handle_bulk_upserted(cls, previous_instances, instances, update_fields):
+        """
+        Called after instances were written with bulk_upsert, which skips
+        lifecycle hooks. previous_instances maps ids to the rows as they were
+        before the upsert
+        """
+        pass
+
+    @classmethod
+    def handle_bulk_created(cls, instances):
+        """
+        Called once for the new rows an upsert batch created, after the
+        creation hooks of models with has_creation_hooks ran
+        """
+        pass
+
+
+class RealityForeignKeyResolver:
+    """
+    Resolves ids of MLS/Office/Agent rows referenced by Reality rows.
+    After preload(), resolving the foreign keys of the preloaded rows
+    costs no queries
+    """
+
+    def __init__(self):
+        self.known_ids = {}
+
+    def preload(self, ModelClass, reality_dicts):
+        ids_by_related_model = {}
+        for reality_dict in reality_dicts:
+            for RelatedModel, related_id in ModelClass.get_reality_foreign_keys(
+                reality_dict
+            ):
+                if related_id:
+                    ids_by_related_model.setdefault(RelatedModel, set()).add(
+                        str(related_id)
+                    )
+        for RelatedModel, related_ids in ids_by_related_model.items():
+            self.known_ids[RelatedModel] = set(
+                RelatedModel.objects.filter(id__in=related_ids).values_list(
+                    "id", flat=True
+                )
+            )
+        return self
+
+    def resolve(self, RelatedModel, related_id):
+        if not related_id:
+            return None
+        related_id = str(related_id)
+        known_ids = self.known_ids.get(RelatedModel)
+        if known_ids is None:
+            # nothing preloaded, e.g. a single row import
+            if not RelatedModel.objects.filter(id=related_id).exists():
+                return None
+            return related_id
+        return related_id if related_id in known_ids else None
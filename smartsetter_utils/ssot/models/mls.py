@@ -1,4 +1,5 @@
 import csv
+import hashlib
 
 from django.apps import apps
 from django.contrib.gis.db import models
@@ -18,9 +19,33 @@ class MLSQuerySet(CommonQuerySet):
     def invisible(self):
         return self.filter(visible=False)
 
+    def sync_agent_materialized_view_indexes(self):
+        for mls in self:
+            mls.sync_agent_materialized_view_indexes()
+
 
 class MLS(LifecycleModelMixin, CommonFields, TimeStampedModel):
     MLS_NAME_LENGTH = 256
+    # indexes of every agent materialized view besides the unique one on id,
+    # mirroring the ssot_agent ones portal filters hit. Edit and run the
+    # sync_view_indexes command to add or drop them across all views
+    AGENT_MATERIALIZED_VIEW_INDEXES = {
+        "city": "(city)",
+        "state": "(state)",
+        "zipcode": "(zipcode)",
+        "phone": "(phone)",
+        "total_production": "(total_production)",
+        "total_transactions_count": "(total_transactions_count)",
+        "tenure": "(tenure)",
+        "location": "USING gist (location)",
+        # text filters compare UPPER(field::text), see apply_filter_to_queryset
+        "name_trgm": "USING gin (UPPER(name::text) gin_trgm_ops)",
+        "city_trgm": "USING gin (UPPER(city::text) gin_trgm_ops)",
+        "zipcode_trgm": "USING gin (UPPER(zipcode::text) gin_trgm_ops)",
+        "phone_trgm": "USING gin (UPPER(phone::text) gin_trgm_ops)",
+    }
+    # Postgres truncates longer identifiers
+    MAX_INDEX_NAME_LENGTH = 63
 
     id = models.CharField(max_length=32, primary_key=True)
     name = models.CharField(max_length=MLS_NAME_LENGTH)
@@ -106,12 +131,93 @@ class MLS(LifecycleModelMixin, CommonFields, TimeStampedModel):
                 WHERE {'''status = 'Active' AND''' if has_active_agents else ''} mls_id = '{self.id}'
             """
             )
+        self.create_agent_materialized_view_unique_index()
+        self.create_agent_materialized_view_indexes()
+
+    def create_agent_materialized_view_unique_index(self):
+        # REFRESH ... CONCURRENTLY needs a unique index to diff the old and
+        # new rows by. IF NOT EXISTS covers views created before it was added
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE UNIQUE INDEX IF NOT EXISTS "
+                f"{self.get_agent_materialized_view_index_name('id')} "
+                f"ON {self.agent_materialized_view_table_name} (id)"
+            )
+
+    def create_agent_materialized_view_indexes(self, names=None):
+        with connection.cursor() as cursor:
+            for name in names or self.AGENT_MATERIALIZED_VIEW_INDEXES:
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS "
+                    f"{self.get_agent_materialized_view_index_name(name)} "
+                    f"ON {self.agent_materialized_view_table_name} "
+                    f"{self.AGENT_MATERIALIZED_VIEW_INDEXES[name]}"
+                )
+
+    def sync_agent_materialized_view_indexes(self):
+        """
+        Creates the declared indexes the view is missing and drops the ones
+        it has that aren't declared anymore. MLSs without a view are skipped
+        """
+        if not self.agent_materialized_view_exists():
+            return
+        declared_index_names = {
+            self.get_agent_materialized_view_index_name(name)
+            for name in ["id", *self.AGENT_MATERIALIZED_VIEW_INDEXES]
+        }
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT indexname FROM pg_indexes WHERE tablename = %s",
+                [self.agent_materialized_view_table_name],
+            )
+            for (index_name,) in cursor.fetchall():
+                if index_name not in declared_index_names:
+                    cursor.execute(f"DROP INDEX {index_name}")
+        self.create_agent_materialized_view_unique_index()
+        self.create_agent_materialized_view_indexes()
+
+    def get_agent_materialized_view_index_name(self, name):
+        index_name = f"{self.agent_materialized_view_table_name}_{name}"
+        if len(index_name) <= self.MAX_INDEX_NAME_LENGTH:
+            return index_name
+        # keep names of long views distinct after shortening them
+        view_hash = hashlib.md5(
+            self.agent_materialized_view_table_name.encode()
+        ).hexdigest()[:8]
+        view_prefix = self.agent_materialized_view_table_name[
+            : self.MAX_INDEX_NAME_LENGTH - len(name) - len(view_hash) - 2
+        ]
+        return f"{view_prefix}_{view_hash}_{name}"
+
+    def refresh_agent_materialized_view(self, concurrently=True):
+        """
+        A concurrent refresh lets MyMLS pages keep reading the view while it
+        rebuilds, instead of blocking on an exclusive lock, at the cost of a
+        slower refresh
+        """
+        if concurrently:
+            self.create_agent_materialized_view_unique_index()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"REFRESH MATERIALIZED VIEW {'CONCURRENTLY ' if concurrently else ''}"
+                f"{self.agent_materialized_view_table_name}"
+            )
+
+    def agent_materialized_view_exists(self):
+        # MLSs bulk created by import_from_s3 skip the hook creating the view
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT to_regclass(%s) IS NOT NULL",
+                [self.agent_materialized_view_table_name],
+            )
+            return cursor.fetchone()[0]
 
-    def refresh_agent_materialized_view(self):
+    def get_agent_materialized_view_row_count(self):
         with connection.cursor() as cursor:
             cursor.execute(
-                f"REFRESH MATERIALIZED VIEW {self.agent_materialized_view_table_name}"
+                f"SELECT COUNT(*) FROM {self.agent_materialized_view_table_name}"
             )
+            return cursor.fetchone()[0]
 
     def delete_materialized_view(self):
         with connection.cursor() as cursor:
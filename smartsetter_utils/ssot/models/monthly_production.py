@@ -0,0 +1,184 @@
+from dateutil.relativedelta import relativedelta
+from django.contrib.gis.db import models
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from model_utils.choices import Choices
+
+from smartsetter_utils.ssot.models.agent import Agent
+from smartsetter_utils.ssot.models.office import Office
+from smartsetter_utils.ssot.models.transaction import Transaction
+
+# every {placeholder} is a table or column name, every %s a parameter
+MONTHLY_PRODUCTION_SQL = """
+INSERT INTO {rollup_table} ({owner_column}, role, month, transactions_count, production)
+SELECT owner_id, role, month, COUNT(*), COALESCE(SUM(sold_price), 0)
+FROM (
+    {role_selects}
+) AS role_transactions
+GROUP BY owner_id, role, month
+"""
+ROLE_SELECT_SQL = """
+    SELECT
+        {owner_column} AS owner_id, %s AS role,
+        DATE_TRUNC('month', closed_date)::date AS month, sold_price
+    FROM {transaction_table}
+    WHERE {owner_column} IN ({scoped_owners})
+"""
+
+
+class MonthlyProductionQuerySet(models.QuerySet):
+    def sum_by_role(self):
+        return {
+            row["role"]: {
+                "count": row["transactions_count"],
+                "production": row["production"],
+            }
+            for row in self.order_by()
+            .values("role")
+            .annotate(
+                transactions_count=Sum("transactions_count"),
+                production=Sum("production"),
+            )
+        }
+
+
+class MonthlyProduction(models.Model):
+    """
+    Transactions and summed sold_price per owner, role and closing month,
+    kept by the ingest so stats over any window add up a few dozen rows
+    instead of scanning transactions. Transactions without a closed_date
+    are counted under a null month, which only all-time stats include
+    """
+
+    ROLE_CHOICES = Choices("listing", "colisting", "selling", "coselling")
+
+    role = models.CharField(max_length=16, choices=ROLE_CHOICES)
+    month = models.DateField(null=True, blank=True)
+    transactions_count = models.PositiveIntegerField(default=0)
+    production = models.PositiveBigIntegerField(default=0)
+
+    objects = MonthlyProductionQuerySet.as_manager()
+
+    # transaction foreign key of each role, set by subclasses
+    role_fields = {}
+    owner_field = None
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def rebuild(cls, owner_queryset):
+        """
+        Replaces the rows of the owners in owner_queryset with ones computed
+        from their transactions by one INSERT ... SELECT ... GROUP BY
+        """
+        owner_column = cls._meta.get_field(cls.owner_field).column
+        scoped_owners_sql, scoped_owners_params = (
+            owner_queryset.order_by().values("id").query.sql_with_params()
+        )
+        role_selects = []
+        params = []
+        for role, field_name in cls.role_fields.items():
+            role_selects.append(
+                ROLE_SELECT_SQL.format(
+                    owner_column=Transaction._meta.get_field(field_name).column,
+                    transaction_table=Transaction._meta.db_table,
+                    scoped_owners=scoped_owners_sql,
+                )
+            )
+            params += [role, *scoped_owners_params]
+        with transaction.atomic():
+            cls.objects.filter(**{f"{cls.owner_field}__in": owner_queryset}).delete()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    MONTHLY_PRODUCTION_SQL.format(
+                        rollup_table=cls._meta.db_table,
+                        owner_column=owner_column,
+                        role_selects="UNION ALL".join(role_selects),
+                    ),
+                    params,
+                )
+
+    @classmethod
+    def get_stats(cls, owner_id, start_date=None):
+        """
+        {role: {"count": ..., "production": ...}} of the owner's transactions
+        closed on or after start_date, or of all of them without one. Whole
+        months come from the rollup, the rest of start_date's month from the
+        transactions closed in it
+        """
+        stats = {role: {"count": 0, "production": 0} for role in cls.role_fields}
+        rollups = cls.objects.filter(**{f"{cls.owner_field}_id": owner_id})
+        if start_date is None:
+            stats.update(rollups.sum_by_role())
+            return stats
+
+        first_whole_month = start_date.replace(day=1)
+        if start_date.day > 1:
+            first_whole_month += relativedelta(months=1)
+            partial_month = Transaction.objects.filter(
+                Q(
+                    _connector=Q.OR,
+                    **{
+                        f"{field_name}_id": owner_id
+                        for field_name in cls.role_fields.values()
+                    },
+                ),
+                closed_date__gte=start_date,
+                closed_date__lt=first_whole_month,
+            ).aggregate(
+                **{
+                    f"{role}_{aggregate_name}": aggregate(
+                        field, filter=Q(**{f"{field_name}_id": owner_id})
+                    )
+                    for role, field_name in cls.role_fields.items()
+                    for aggregate_name, aggregate, field in (
+                        ("count", Count, "id"),
+                        ("production", Sum, "sold_price"),
+                    )
+                }
+            )
+            for role, role_stats in stats.items():
+                role_stats["count"] += partial_month[f"{role}_count"]
+                role_stats["production"] += partial_month[f"{role}_production"] or 0
+
+        for role, role_stats in (
+            rollups.filter(month__gte=first_whole_month).sum_by_role().items()
+        ):
+            stats[role]["count"] += role_stats["count"]
+            stats[role]["production"] += role_stats["production"]
+        return stats
+
+
+class AgentMonthlyProduction(MonthlyProduction):
+    agent = models.ForeignKey(
+        Agent, related_name="monthly_production", on_delete=models.CASCADE
+    )
+
+    role_fields = {
+        MonthlyProduction.ROLE_CHOICES.listing: "listing_agent",
+        MonthlyProduction.ROLE_CHOICES.colisting: "colisting_agent",
+        MonthlyProduction.ROLE_CHOICES.selling: "selling_agent",
+        MonthlyProduction.ROLE_CHOICES.coselling: "coselling_agent",
+    }
+    owner_field = "agent"
+
+    class Meta:
+        unique_together = ("agent", "role", "month")
+
+
+class OfficeMonthlyProduction(MonthlyProduction):
+    office = models.ForeignKey(
+        Office, related_name="monthly_production", on_delete=models.CASCADE
+    )
+
+    role_fields = {
+        MonthlyProduction.ROLE_CHOICES.listing: "listing_office",
+        MonthlyProduction.ROLE_CHOICES.colisting: "colisting_office",
+        MonthlyProduction.ROLE_CHOICES.selling: "selling_office",
+        MonthlyProduction.ROLE_CHOICES.coselling: "coselling_office",
+    }
+    owner_field = "office"
+
+    class Meta:
+        unique_together = ("office", "role", "month")
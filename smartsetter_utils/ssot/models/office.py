@@ -2,14 +2,14 @@ import urllib3.exceptions
 from django.conf import settings
 from django.contrib.gis.db import models
 from django.core import validators
-from django_lifecycle import AFTER_UPDATE, BEFORE_CREATE, hook
+from django_lifecycle import AFTER_CREATE, AFTER_UPDATE, hook
 from django_lifecycle.models import LifecycleModelMixin
 from hubspot.crm.companies import (
     SimplePublicObjectInputForCreate as HubSpotCompanyInputForCreate,
 )
 from hubspot.crm.companies.exceptions import ApiException as CompanyApiException
 
-from smartsetter_utils.core import Environments
+from smartsetter_utils.core import Environments, run_task_in_transaction
 from smartsetter_utils.hubspot.utils import get_hubspot_client
 from smartsetter_utils.ssot.models.base_models import (
     AgentOfficeCommonFields,
@@ -25,6 +25,17 @@ class OfficeQuerySet(CommonQuerySet):
     def filter_hubspot_material(self):
         return self.active()
 
+    def update_cached_stats(self):
+        from smartsetter_utils.ssot.models.monthly_production import (
+            OfficeMonthlyProduction,
+        )
+        from smartsetter_utils.ssot.models.office_stats import (
+            update_office_cached_stats,
+        )
+
+        update_office_cached_stats(self)
+        OfficeMonthlyProduction.rebuild(self)
+
 
 class BadDataException(Exception):
     pass
@@ -33,6 +44,15 @@ class BadDataException(Exception):
 class Office(RealityDBBase, LifecycleModelMixin, CommonFields, AgentOfficeCommonFields):
 
     reality_table_name = "tblOffices"
+    reality_key_fields = ("OfficeID",)
+    reality_source_fields = (
+        "Office",
+        "Address",
+        "City",
+        "PostalCode",
+        "Phone",
+        "State",
+    )
 
     id = models.CharField(max_length=256, primary_key=True)
     name = models.CharField(max_length=128, null=True, blank=True)
@@ -44,6 +64,19 @@ class Office(RealityDBBase, LifecycleModelMixin, CommonFields, AgentOfficeCommon
     main_office_name = models.CharField(max_length=128, null=True, blank=True)
     office_mls_id = models.CharField(max_length=128, null=True, blank=True)
 
+    source_hash = models.CharField(max_length=32, null=True, blank=True)
+
+    # cached stats, see update_office_cached_stats
+    listing_transactions_count_12m = models.PositiveIntegerField(default=0)
+    selling_transactions_count_12m = models.PositiveIntegerField(default=0)
+    listing_production_12m = models.PositiveBigIntegerField(default=0)
+    selling_production_12m = models.PositiveBigIntegerField(default=0)
+    listing_transactions_count_all_time = models.PositiveIntegerField(default=0)
+    selling_transactions_count_all_time = models.PositiveIntegerField(default=0)
+    listing_production_all_time = models.PositiveBigIntegerField(default=0)
+    selling_production_all_time = models.PositiveBigIntegerField(default=0)
+    agents_count = models.PositiveIntegerField(default=0)
+
     churn_score = models.FloatField(
         null=True,
         blank=True,
@@ -53,23 +86,36 @@ class Office(RealityDBBase, LifecycleModelMixin, CommonFields, AgentOfficeCommon
 
     objects = OfficeQuerySet.as_manager()
 
+    HUBSPOT_PROPERTY_FIELDS = [
+        "name",
+        "address",
+        "city",
+        "zipcode",
+        "phone",
+        "state",
+        "status",
+    ]
+
     def __str__(self):
         return self.name
 
-    @hook(BEFORE_CREATE)
-    def handle_before_create(self):
-        from smartsetter_utils.ssot.tasks import handle_before_office_created
+    @hook(AFTER_CREATE)
+    def handle_after_create(self):
+        from smartsetter_utils.ssot.tasks import (
+            ModelClassMapper,
+            geocode_missing_locations,
+        )
 
-        if Environments.is_dev():
+        if Environments.is_dev() or self.location or not self.zipcode:
             return
 
-        handle_before_office_created(self)
+        run_task_in_transaction(
+            geocode_missing_locations,
+            model_class_id=ModelClassMapper.office_id,
+            id=self.id,
+        )
 
-    @hook(
-        AFTER_UPDATE,
-        when_any=["name", "address", "city", "zipcode", "phone", "state", "status"],
-        has_changed=True,
-    )
+    @hook(AFTER_UPDATE, when_any=HUBSPOT_PROPERTY_FIELDS, has_changed=True)
     def handle_hubspot_properties_changed(self):
         if Environments.is_dev():
             return
@@ -80,10 +126,31 @@ class Office(RealityDBBase, LifecycleModelMixin, CommonFields, AgentOfficeCommon
             self.create_hubspot_company()
 
     @classmethod
-    def from_reality_dict(cls, reality_dict):
+    def handle_bulk_upserted(cls, previous_offices, offices, update_fields):
+        # bulk_upsert doesn't fire AFTER_UPDATE, so sync changed offices here.
+        # the previous instances carry the fields that weren't upserted
+        # like hubspot_id
+        for office in offices:
+            previous_office = previous_offices[office.id]
+            hubspot_properties_changed = any(
+                getattr(previous_office, field_name) != getattr(office, field_name)
+                for field_name in cls.HUBSPOT_PROPERTY_FIELDS
+                if field_name in update_fields
+            )
+            if hubspot_properties_changed:
+                for field_name in update_fields:
+                    setattr(previous_office, field_name, getattr(office, field_name))
+                previous_office.handle_hubspot_properties_changed()
+
+    @classmethod
+    def from_reality_dict(cls, reality_dict, fk_resolver=None):
+        property_dict = cls.get_property_dict_from_reality_dict(
+            reality_dict, fk_resolver
+        )
         return Office(
             id=cls.get_id_from_reality_dict(reality_dict),
-            **cls.get_property_dict_from_reality_dict(reality_dict),
+            source_hash=cls.get_reality_hash(property_dict),
+            **property_dict,
         )
 
     @staticmethod
@@ -93,18 +160,24 @@ class Office(RealityDBBase, LifecycleModelMixin, CommonFields, AgentOfficeCommon
         return f"{office_id}__{mls_id}"
 
     @staticmethod
-    def get_property_dict_from_reality_dict(reality_dict):
+    def get_property_dict_from_reality_dict(reality_dict, fk_resolver=None):
         data = {
             "name": get_brand_fixed_office_name(reality_dict["Office"]),
             "office_id": reality_dict["OfficeID"],
             **AgentOfficeCommonFields.get_common_properties_from_reality_dict(
-                reality_dict, "Phone"
+                reality_dict, "Phone", fk_resolver=fk_resolver
             ),
         }
         if data["name"] == data["address"]:
             raise BadDataException
         return data
 
+    @staticmethod
+    def get_reality_foreign_keys(reality_dict):
+        from smartsetter_utils.ssot.models.mls import MLS
+
+        return [(MLS, reality_dict["MLSID"])]
+
     def get_hubspot_dict(self):
         hubspot_dict = {
             "name": self.name,
@@ -197,27 +270,21 @@ class Office(RealityDBBase, LifecycleModelMixin, CommonFields, AgentOfficeCommon
             pass
 
     def get_hubspot_stats_dict(self):
-        listing_transactions = self.listing_transactions.all()
-        listing_transactions_12m = listing_transactions.filter_12m()
-        selling_transactions = self.selling_transactions.all()
-        selling_transactions_12m = selling_transactions.filter_12m()
-        listing_production_12m = listing_transactions_12m.production()
-        selling_production_12m = selling_transactions_12m.production()
-
         return {
-            "sales_volume__12m_": listing_production_12m + selling_production_12m,
-            "sales_listing_volume__12m_": listing_production_12m,
-            "sales_buying_volume__12m_": selling_production_12m,
-            "sales_listing_count__12m_": listing_transactions_12m.count(),
-            "sales_buying_count__12m_": selling_transactions_12m.count(),
-            "sales_volume__all_time_": listing_transactions.production()
-            + selling_transactions.production(),
-            "sales_count__all_time_": listing_transactions.count()
-            + selling_transactions.count(),
+            "sales_volume__12m_": self.listing_production_12m
+            + self.selling_production_12m,
+            "sales_listing_volume__12m_": self.listing_production_12m,
+            "sales_buying_volume__12m_": self.selling_production_12m,
+            "sales_listing_count__12m_": self.listing_transactions_count_12m,
+            "sales_buying_count__12m_": self.selling_transactions_count_12m,
+            "sales_volume__all_time_": self.listing_production_all_time
+            + self.selling_production_all_time,
+            "sales_count__all_time_": self.listing_transactions_count_all_time
+            + self.selling_transactions_count_all_time,
         }
 
     def get_hubspot_employee_count_dict(self):
-        return {"numberofemployees": self.agents.count()}
+        return {"numberofemployees": self.agents_count}
 
     @property
     def should_be_in_hubspot(self):
@@ -0,0 +1,81 @@
+from django.db import connection
+
+from smartsetter_utils.ssot.models.agent import Agent
+from smartsetter_utils.ssot.models.transaction import Transaction, get_12m_start_date
+
+# every {placeholder} is a table name, every %s a parameter
+OFFICE_CACHED_STATS_SQL = """
+WITH scoped_offices AS (
+    {scoped_offices}
+),
+office_transactions AS (
+    SELECT listing_office_id AS office_id, TRUE AS is_listing, closed_date, sold_price
+    FROM {transaction_table}
+    WHERE listing_office_id IN (SELECT id FROM scoped_offices)
+    UNION ALL
+    SELECT selling_office_id, FALSE, closed_date, sold_price
+    FROM {transaction_table}
+    WHERE selling_office_id IN (SELECT id FROM scoped_offices)
+),
+stats AS (
+    SELECT
+        office_id,
+        COUNT(*) FILTER (WHERE is_listing AND closed_date >= %s)
+            AS listing_count_12m,
+        COUNT(*) FILTER (WHERE NOT is_listing AND closed_date >= %s)
+            AS selling_count_12m,
+        SUM(sold_price) FILTER (WHERE is_listing AND closed_date >= %s)
+            AS listing_production_12m,
+        SUM(sold_price) FILTER (WHERE NOT is_listing AND closed_date >= %s)
+            AS selling_production_12m,
+        COUNT(*) FILTER (WHERE is_listing) AS listing_count,
+        COUNT(*) FILTER (WHERE NOT is_listing) AS selling_count,
+        SUM(sold_price) FILTER (WHERE is_listing) AS listing_production,
+        SUM(sold_price) FILTER (WHERE NOT is_listing) AS selling_production
+    FROM office_transactions
+    GROUP BY office_id
+),
+agents AS (
+    SELECT office_id, COUNT(*) AS agents_count
+    FROM {agent_table}
+    WHERE office_id IN (SELECT id FROM scoped_offices)
+    GROUP BY office_id
+)
+UPDATE {office_table} AS office
+SET
+    listing_transactions_count_12m = COALESCE(stats.listing_count_12m, 0),
+    selling_transactions_count_12m = COALESCE(stats.selling_count_12m, 0),
+    listing_production_12m = COALESCE(stats.listing_production_12m, 0),
+    selling_production_12m = COALESCE(stats.selling_production_12m, 0),
+    listing_transactions_count_all_time = COALESCE(stats.listing_count, 0),
+    selling_transactions_count_all_time = COALESCE(stats.selling_count, 0),
+    listing_production_all_time = COALESCE(stats.listing_production, 0),
+    selling_production_all_time = COALESCE(stats.selling_production, 0),
+    agents_count = COALESCE(agents.agents_count, 0)
+FROM scoped_offices
+LEFT JOIN stats ON stats.office_id = scoped_offices.id
+LEFT JOIN agents ON agents.office_id = scoped_offices.id
+WHERE office.id = scoped_offices.id
+"""
+
+
+def update_office_cached_stats(office_queryset):
+    """
+    Recomputes the cached stats and agent headcount of the offices in
+    office_queryset with one UPDATE ... FROM, replacing the nine aggregate
+    queries per office the HubSpot sync used to run
+    """
+    scoped_offices_sql, scoped_offices_params = (
+        office_queryset.order_by().values("id").query.sql_with_params()
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            OFFICE_CACHED_STATS_SQL.format(
+                scoped_offices=scoped_offices_sql,
+                transaction_table=Transaction._meta.db_table,
+                agent_table=Agent._meta.db_table,
+                office_table=office_queryset.model._meta.db_table,
+            ),
+            [*scoped_offices_params, *[get_12m_start_date()] * 4],
+        )
+        return cursor.rowcount
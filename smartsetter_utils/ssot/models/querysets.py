@@ -1,4 +1,5 @@
 from django.contrib.gis.db import models
+from django.db import IntegrityError, transaction
 
 
 class CommonFieldsQuerySet(models.QuerySet):
@@ -31,3 +32,36 @@ class CommonQuerySet(CommonFieldsQuerySet):
 
     def active(self):
         return self.filter(status="Active")
+
+    def bulk_upsert(self, objs, update_fields, batch_size=1000):
+        """
+        INSERT ... ON CONFLICT (id) DO UPDATE, only touching update_fields
+        on existing rows. Like bulk_create, lifecycle hooks don't run
+        """
+        return self.bulk_create(
+            objs,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=["id"],
+            update_fields=update_fields,
+        )
+
+    def bulk_create_bisecting(self, objs):
+        """
+        bulk_create that isolates the rows violating a constraint by splitting
+        the failing batch in halves until they're found, so a few bad rows
+        cost a handful of extra statements instead of one per row.
+        Returns the created objects and (object, exception) pairs for the
+        rows that couldn't be created
+        """
+        try:
+            with transaction.atomic():
+                self.bulk_create(objs)
+        except IntegrityError as exc:
+            if len(objs) == 1:
+                return [], [(objs[0], exc)]
+            middle = len(objs) // 2
+            first_created, first_failed = self.bulk_create_bisecting(objs[:middle])
+            last_created, last_failed = self.bulk_create_bisecting(objs[middle:])
+            return first_created + last_created, first_failed + last_failed
+        return objs, []
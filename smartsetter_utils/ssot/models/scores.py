@@ -0,0 +1,83 @@
+from django.db import connection
+
+SCORE_NAMES = (
+    "sales_volume_score",
+    "transaction_count_score",
+    "tenure_score",
+    "office_size_score",
+)
+
+# the score properties of AbstractAgent as SQL, in SCORE_NAMES order.
+# every {placeholder} is a table name, every %s a parameter
+AGENT_SCORES_SQL = """
+WITH scoped_agents AS (
+    {scoped_agents}
+),
+office_sizes AS (
+    SELECT office_id, COUNT(*) AS office_size
+    FROM {agent_table}
+    WHERE office_id IN (
+        SELECT office_id FROM {agent_table}
+        WHERE id IN (SELECT id FROM scoped_agents)
+    )
+    GROUP BY office_id
+)
+SELECT
+    agent.id,
+    (
+        CASE
+            WHEN agent.total_production = 0 THEN 10
+            WHEN agent.total_production > 2e6 THEN 0
+            ELSE (2e6 - agent.total_production) / 2e5
+        END
+    )::double precision,
+    (
+        CASE
+            WHEN agent.total_transactions_count = 0 THEN 10
+            WHEN agent.total_transactions_count > 10 THEN 10
+            ELSE 10 - agent.total_transactions_count
+        END
+    )::double precision,
+    (
+        CASE
+            WHEN agent.tenure IS NULL OR agent.tenure = INTERVAL '0' THEN 35
+            WHEN tenure.years > 7 THEN 0
+            ELSE (7 - tenure.years) * 5
+        END
+    )::double precision,
+    (
+        CASE
+            WHEN agent.office_id IS NULL THEN 0
+            WHEN office_sizes.office_size > 75 THEN 15
+            ELSE office_sizes.office_size / 5.0
+        END
+    )::double precision
+FROM {agent_table} AS agent
+LEFT JOIN office_sizes ON office_sizes.office_id = agent.office_id
+-- whole days, like the relativedelta the property goes through
+CROSS JOIN LATERAL (
+    SELECT FLOOR(EXTRACT(EPOCH FROM agent.tenure) / 86400) / 365 AS years
+) AS tenure
+WHERE agent.id IN (SELECT id FROM scoped_agents)
+"""
+
+
+def get_scores(agent_queryset):
+    """
+    {agent id: {score name: score}} for the agents in agent_queryset, from
+    one query instead of evaluating the score properties and counting office
+    agents one agent at a time. How the scores add up to likelihood_to_move
+    and an office's churn_score isn't specified yet, so neither is written
+    """
+    scoped_agents_sql, scoped_agents_params = (
+        agent_queryset.order_by().values("id").query.sql_with_params()
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            AGENT_SCORES_SQL.format(
+                scoped_agents=scoped_agents_sql,
+                agent_table=agent_queryset.model._meta.db_table,
+            ),
+            scoped_agents_params,
+        )
+        return {row[0]: dict(zip(SCORE_NAMES, row[1:])) for row in cursor.fetchall()}
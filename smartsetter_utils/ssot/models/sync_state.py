@@ -0,0 +1,200 @@
+from django.contrib.gis.db import models
+from django.utils import timezone
+from model_utils.choices import Choices
+from model_utils.models import TimeStampedModel
+
+
+class RealityTableWatermark(TimeStampedModel):
+    """
+    Highest value of a Reality table's watermark field seen by the last
+    successful sync, used to only read rows changed since then
+    """
+
+    table_name = models.CharField(max_length=64)
+    # MLSID of a sharded sync, empty for whole table syncs
+    shard = models.CharField(max_length=32, blank=True, default="")
+    field_name = models.CharField(max_length=64)
+    value = models.CharField(max_length=64, null=True, blank=True)
+
+    class Meta:
+        unique_together = ("table_name", "shard")
+
+    def __str__(self):
+        return f"{self.table_name}.{self.field_name} >= {self.value}"
+
+    @classmethod
+    def get_value_for_model(cls, ModelClass, shard=""):
+        field_name = ModelClass.get_reality_watermark_field()
+        if not field_name:
+            return None
+        return (
+            cls.objects.filter(
+                table_name=ModelClass.reality_table_name,
+                shard=shard,
+                field_name=field_name,
+            )
+            .values_list("value", flat=True)
+            .first()
+        )
+
+    @classmethod
+    def advance_for_model(cls, ModelClass, value, shard=""):
+        field_name = ModelClass.get_reality_watermark_field()
+        if not field_name or value is None:
+            return
+        cls.objects.update_or_create(
+            table_name=ModelClass.reality_table_name,
+            shard=shard,
+            defaults={"field_name": field_name, "value": str(value)},
+        )
+
+
+class IngestRun(TimeStampedModel):
+    """
+    A Reality DB import or sync. Its checkpoints let retried or restarted
+    tasks continue where the previous attempt stopped
+    """
+
+    KIND_CHOICES = Choices(("create", "Initial import"), ("pull", "Pull updates"))
+    # table_name of the checkpoint of the stages run once a shard's tables
+    # are loaded (geocoding, cached stats)
+    POST_INGEST_CHECKPOINT_NAME = "post_ingest"
+
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    full = models.BooleanField(default=False)
+    copy = models.BooleanField(default=False)
+    sharded = models.BooleanField(default=False)
+    # one per table and shard plus one post-ingest checkpoint per shard,
+    # known once the shards are dispatched
+    expected_checkpoint_count = models.PositiveIntegerField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.kind} #{self.id}"
+
+    def get_checkpoint(self, ModelClass, shard=""):
+        return self.checkpoints.get_or_create(
+            table_name=ModelClass.reality_table_name, shard=shard
+        )[0]
+
+    def get_duplicate_count(self):
+        return (
+            self.checkpoints.aggregate(models.Sum("duplicate_count"))[
+                "duplicate_count__sum"
+            ]
+            or 0
+        )
+
+    def get_post_ingest_checkpoint(self, shard=""):
+        return self.checkpoints.get_or_create(
+            table_name=self.POST_INGEST_CHECKPOINT_NAME, shard=shard
+        )[0]
+
+    def finish_if_completed(self):
+        if (
+            self.expected_checkpoint_count is not None
+            and self.checkpoints.filter(completed=True).count()
+            >= self.expected_checkpoint_count
+        ):
+            self.finished = timezone.now()
+            self.save(update_fields=["finished", "modified"])
+
+
+class IngestCheckpoint(TimeStampedModel):
+    """
+    Key of the last Reality row of a table (and shard) written by a run
+    """
+
+    run = models.ForeignKey(
+        IngestRun, related_name="checkpoints", on_delete=models.CASCADE
+    )
+    table_name = models.CharField(max_length=64)
+    shard = models.CharField(max_length=32, blank=True, default="")
+    last_key = models.JSONField(null=True, blank=True)
+    # rows collapsed into another row of their batch with the same id
+    duplicate_count = models.PositiveIntegerField(default=0)
+    completed = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ("run", "table_name", "shard")
+
+    def __str__(self):
+        return f"{self.run} {self.table_name} {self.shard}: {self.last_key}"
+
+    def advance(self, last_key, duplicate_count=0):
+        self.last_key = last_key
+        self.duplicate_count += duplicate_count
+        self.save(update_fields=["last_key", "duplicate_count", "modified"])
+
+    def complete(self):
+        self.completed = True
+        self.save(update_fields=["completed", "modified"])
+
+
+class DirtyRow(models.Model):
+    """
+    Row whose cached stats went stale. The ingest marks them and recomputes
+    only these instead of every row
+    """
+
+    marked = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return str(self.pk)
+
+    @classmethod
+    def mark(cls, ids):
+        cls.objects.bulk_create(
+            [cls(pk=id) for id in set(ids) if id],
+            ignore_conflicts=True,
+            batch_size=1000,
+        )
+
+
+class DirtyAgent(DirtyRow):
+    """
+    Agent whose cached stats or role went stale because the ingest changed
+    one of its transactions or its office
+    """
+
+    # no foreign key, so marking never waits on the agent row's locks
+    agent_id = models.CharField(max_length=32, primary_key=True)
+
+
+class DirtyOffice(DirtyRow):
+    """
+    Office whose cached stats went stale because the ingest changed one of
+    its transactions or moved agents in or out of it
+    """
+
+    office_id = models.CharField(max_length=256, primary_key=True)
+
+
+class DirtyMLS(DirtyRow):
+    """
+    MLS whose agent materialized view went stale because the ingest wrote
+    agent rows of it
+    """
+
+    mls_id = models.CharField(max_length=32, primary_key=True)
+
+
+class AgentMaterializedViewRefresh(TimeStampedModel):
+    """
+    A refresh of an MLS agent materialized view, to see what refreshing
+    which views costs
+    """
+
+    mls = models.ForeignKey(
+        "MLS",
+        related_name="agent_materialized_view_refreshes",
+        on_delete=models.CASCADE,
+    )
+    duration = models.DurationField()
+    row_count = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.mls_id}: {self.row_count} rows in {self.duration}"
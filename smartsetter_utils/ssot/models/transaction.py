@@ -2,22 +2,30 @@ from dateutil.relativedelta import relativedelta
 from django.contrib.gis.db import models
 from django.db.models import Sum
 from django.utils import timezone
-from django_lifecycle import BEFORE_CREATE, hook
+from django_lifecycle import AFTER_CREATE, hook
 from django_lifecycle.models import LifecycleModelMixin
 from model_utils.models import TimeStampedModel
 
-from smartsetter_utils.core import Environments
+from smartsetter_utils.core import Environments, run_task_in_transaction
 from smartsetter_utils.ssot.models.agent import Agent
-from smartsetter_utils.ssot.models.base_models import CommonFields, RealityDBBase
+from smartsetter_utils.ssot.models.base_models import (
+    CommonFields,
+    RealityDBBase,
+    RealityForeignKeyResolver,
+)
 from smartsetter_utils.ssot.models.mls import MLS
 from smartsetter_utils.ssot.models.office import Office
 from smartsetter_utils.ssot.models.querysets import CommonQuerySet
+from smartsetter_utils.ssot.models.sync_state import DirtyAgent, DirtyOffice
+
+
+def get_12m_start_date():
+    return timezone.localdate(timezone.now() - relativedelta(years=1))
 
 
 class TransactionQuerySet(CommonQuerySet):
     def filter_12m(self):
-        year_ago = timezone.now() - relativedelta(years=1)
-        return self.filter(closed_date__gte=year_ago)
+        return self.filter(closed_date__gte=get_12m_start_date())
 
     def filter_listing(self, agent):
         return self.filter(listing_agent=agent)
@@ -38,6 +46,37 @@ class TransactionQuerySet(CommonQuerySet):
 class Transaction(RealityDBBase, LifecycleModelMixin, CommonFields, TimeStampedModel):
 
     reality_table_name = "tblTransactions"
+    reality_key_fields = ("MLSNumber",)
+    reality_source_fields = (
+        "HomeAddress",
+        "DIST",
+        "Community",
+        "CITY",
+        "COUNTY",
+        "ZIPCODE",
+        "StateCode",
+        "ListPrice",
+        "SoldPrice",
+        "DOM",
+        "ClosedDate",
+        "LAID",
+        "LOID",
+        "SAID",
+        "SOID",
+    )
+    reality_date_field = "ClosedDate"
+    AGENT_FIELDS = (
+        "listing_agent",
+        "colisting_agent",
+        "selling_agent",
+        "coselling_agent",
+    )
+    OFFICE_FIELDS = (
+        "listing_office",
+        "colisting_office",
+        "selling_office",
+        "coselling_office",
+    )
 
     id = models.CharField(max_length=32, primary_key=True)
     mls_number = models.CharField(max_length=32, null=True, blank=True)
@@ -129,33 +168,76 @@ class Transaction(RealityDBBase, LifecycleModelMixin, CommonFields, TimeStampedM
     originating_system_name = models.CharField(max_length=128, null=True, blank=True)
     source_system_id = models.CharField(max_length=128, null=True, blank=True)
     source_system_name = models.CharField(max_length=128, null=True, blank=True)
+    source_hash = models.CharField(max_length=32, null=True, blank=True)
 
     objects = TransactionQuerySet.as_manager()
 
     def __str__(self):
         return self.mls_number
 
-    @hook(BEFORE_CREATE)
-    def handle_before_create(self):
-        from smartsetter_utils.ssot.tasks import handle_before_transaction_created
+    @hook(AFTER_CREATE)
+    def handle_after_create(self):
+        from smartsetter_utils.ssot.tasks import (
+            ModelClassMapper,
+            geocode_missing_locations,
+        )
 
-        if Environments.is_dev():
+        if Environments.is_dev() or self.location or not self.zipcode:
             return
 
-        handle_before_transaction_created(self)
+        run_task_in_transaction(
+            geocode_missing_locations,
+            model_class_id=ModelClassMapper.transaction_id,
+            id=self.id,
+        )
+
+    def get_agent_ids(self):
+        return [getattr(self, f"{field_name}_id") for field_name in self.AGENT_FIELDS]
+
+    def get_office_ids(self):
+        return [getattr(self, f"{field_name}_id") for field_name in self.OFFICE_FIELDS]
+
+    @classmethod
+    def handle_bulk_upserted(cls, previous_transactions, transactions, update_fields):
+        # the agents and offices a transaction moved away from lose its stats,
+        # the ones it moved to gain them, and a changed price or date affects
+        # both
+        cls.mark_dirty([*previous_transactions.values(), *transactions])
+
+    @classmethod
+    def handle_bulk_created(cls, transactions):
+        cls.mark_dirty(transactions)
+
+    @staticmethod
+    def mark_dirty(transactions):
+        DirtyAgent.mark(
+            agent_id
+            for transaction in transactions
+            for agent_id in transaction.get_agent_ids()
+        )
+        DirtyOffice.mark(
+            office_id
+            for transaction in transactions
+            for office_id in transaction.get_office_ids()
+        )
 
     @classmethod
-    def from_reality_dict(cls, reality_dict):
+    def from_reality_dict(cls, reality_dict, fk_resolver=None):
+        property_dict = cls.get_property_dict_from_reality_dict(
+            reality_dict, fk_resolver
+        )
         return Transaction(
             id=cls.get_id_from_reality_dict(reality_dict),
-            **cls.get_property_dict_from_reality_dict(reality_dict),
+            source_hash=cls.get_reality_hash(property_dict),
+            **property_dict,
         )
 
     @staticmethod
-    def get_property_dict_from_reality_dict(reality_dict):
+    def get_property_dict_from_reality_dict(reality_dict, fk_resolver=None):
+        fk_resolver = fk_resolver or RealityForeignKeyResolver()
         return {
             "mls_number": reality_dict["MLSNumber"],
-            "mls": MLS.objects.get_by_id_or_none(id=reality_dict["MLSID"]),
+            "mls_id": fk_resolver.resolve(MLS, reality_dict["MLSID"]),
             "address": reality_dict["HomeAddress"],
             "district": reality_dict["DIST"],
             "community": reality_dict["Community"],
@@ -167,20 +249,30 @@ class Transaction(RealityDBBase, LifecycleModelMixin, CommonFields, TimeStampedM
             "sold_price": reality_dict["SoldPrice"],
             "days_on_market": reality_dict["DOM"],
             "closed_date": reality_dict["ClosedDate"],
-            "listing_agent": Agent.objects.get_by_id_or_none(
-                Agent.get_id_from_reality_dict(reality_dict, "LAID")
+            "listing_agent_id": fk_resolver.resolve(
+                Agent, Agent.get_id_from_reality_dict(reality_dict, "LAID")
             ),
-            "listing_office": Office.objects.get_by_id_or_none(
-                Office.get_id_from_reality_dict(reality_dict, "LOID")
+            "listing_office_id": fk_resolver.resolve(
+                Office, Office.get_id_from_reality_dict(reality_dict, "LOID")
             ),
-            "selling_agent": Agent.objects.get_by_id_or_none(
-                Agent.get_id_from_reality_dict(reality_dict, "SAID")
+            "selling_agent_id": fk_resolver.resolve(
+                Agent, Agent.get_id_from_reality_dict(reality_dict, "SAID")
             ),
-            "selling_office": Office.objects.get_by_id_or_none(
-                Office.get_id_from_reality_dict(reality_dict, "SOID")
+            "selling_office_id": fk_resolver.resolve(
+                Office, Office.get_id_from_reality_dict(reality_dict, "SOID")
             ),
         }
 
+    @staticmethod
+    def get_reality_foreign_keys(reality_dict):
+        return [
+            (MLS, reality_dict["MLSID"]),
+            (Agent, Agent.get_id_from_reality_dict(reality_dict, "LAID")),
+            (Office, Office.get_id_from_reality_dict(reality_dict, "LOID")),
+            (Agent, Agent.get_id_from_reality_dict(reality_dict, "SAID")),
+            (Office, Office.get_id_from_reality_dict(reality_dict, "SOID")),
+        ]
+
     @staticmethod
     def get_id_from_reality_dict(reality_dict):
         return f"{reality_dict['MLSNumber']}__{reality_dict['MLSID']}"
@@ -1,4 +1,5 @@
 import csv
+import datetime
 
 from django.contrib.gis.db import models
 from model_utils.models import TimeStampedModel
@@ -22,3 +23,16 @@ class Zipcode(TimeStampedModel):
             ],
             batch_size=1000,
         )
+
+
+class ZipcodeLocation(TimeStampedModel):
+    """
+    The location Elasticsearch returned for a zipcode, or None when it had
+    none, so geocoding doesn't look the same zipcode up on every run
+    """
+
+    # unresolved zipcodes are looked up again once their entry is this old
+    RETRY_UNRESOLVED_AFTER = datetime.timedelta(days=30)
+
+    zipcode = models.CharField(max_length=32, unique=True)
+    location = models.PointField(null=True, blank=True, srid=4326)
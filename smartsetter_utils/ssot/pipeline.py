@@ -0,0 +1,104 @@
+import queue
+import threading
+
+from django.db import connections
+
+_DONE = object()
+
+
+class IngestPipeline:
+    """
+    Runs the read -> transform -> write stages of an ingest concurrently.
+    read is a generator of batches and runs in its own thread, transform
+    runs in a second thread and write runs in the calling thread, so the
+    caller's database connection and transaction are the ones written to.
+    Stages are connected by queues holding at most queue_size batches, which
+    makes a fast reader wait for a slow writer instead of buffering the table.
+    A reader streaming from MySQL leaves its result unread while it waits,
+    which reality_db.connect allows for with a raised net_write_timeout.
+    With threaded=False the stages simply run one after another
+    """
+
+    def __init__(self, read, transform, write, queue_size=2, threaded=True):
+        self.read = read
+        self.transform = transform
+        self.write = write
+        self.threaded = threaded
+        self.read_queue = queue.Queue(maxsize=queue_size)
+        self.transformed_queue = queue.Queue(maxsize=queue_size)
+        self.stopped = threading.Event()
+        self.errors = []
+
+    def run(self):
+        if not self.threaded:
+            for batch in self.read():
+                self.write(self.transform(batch))
+            return
+
+        threads = [
+            threading.Thread(target=self.run_reader, daemon=True),
+            threading.Thread(target=self.run_transformer, daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while not self.stopped.is_set():
+                batch = self.get(self.transformed_queue)
+                if batch is _DONE:
+                    break
+                self.write(batch)
+        except BaseException:
+            self.stopped.set()
+            raise
+        finally:
+            for thread in threads:
+                thread.join()
+        if self.errors:
+            raise self.errors[0]
+
+    def run_reader(self):
+        try:
+            for batch in self.read():
+                if not self.put(self.read_queue, batch):
+                    return
+        except Exception as exc:
+            self.fail(exc)
+        finally:
+            self.put(self.read_queue, _DONE)
+
+    def run_transformer(self):
+        try:
+            while (batch := self.get(self.read_queue)) is not _DONE:
+                if not self.put(self.transformed_queue, self.transform(batch)):
+                    return
+        except Exception as exc:
+            self.fail(exc)
+        finally:
+            self.put(self.transformed_queue, _DONE)
+            # transform may query the database through this thread's own
+            # connection, which Django won't close for us
+            connections.close_all()
+
+    def fail(self, exc):
+        self.errors.append(exc)
+        self.stopped.set()
+
+    def put(self, stage_queue, item):
+        # gives up once the pipeline is stopped so a failed stage downstream
+        # doesn't leave this one blocked on a full queue
+        while not self.stopped.is_set():
+            try:
+                stage_queue.put(item, timeout=1)
+            except queue.Full:
+                continue
+            else:
+                return True
+        return False
+
+    def get(self, stage_queue):
+        while True:
+            try:
+                return stage_queue.get(timeout=1)
+            except queue.Empty:
+                if self.stopped.is_set():
+                    return _DONE
@@ -0,0 +1,224 @@
+import contextlib
+import os
+import queue
+import random
+import threading
+import time
+
+import pymysql.cursors
+import pymysql.err
+from django.conf import settings
+
+REALITY_DB_RETRYABLE_ERRORS = (pymysql.err.OperationalError, pymysql.err.InterfaceError)
+
+
+class RealityDBUnavailable(pymysql.err.OperationalError):
+    """
+    Raised without touching the network while the circuit breaker is open.
+    Subclasses OperationalError so tasks retrying on Reality DB errors
+    back off on it too
+    """
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and fails fast for
+    reset_timeout seconds. After that one trial call is let through while
+    the others keep failing fast: a success closes the breaker again, a
+    failure keeps it open for another timeout. A trial that doesn't report
+    back within reset_timeout makes way for another one
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failure_count = 0
+        self.opened_at = None
+        self.trial_started_at = None
+        self.lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return (
+            self.opened_at is not None
+            and time.monotonic() - self.opened_at < self.reset_timeout
+        )
+
+    def check(self):
+        with self.lock:
+            if self.opened_at is None:
+                return
+            now = time.monotonic()
+            if not self.is_open and (
+                self.trial_started_at is None
+                or now - self.trial_started_at >= self.reset_timeout
+            ):
+                self.trial_started_at = now
+                return
+            raise RealityDBUnavailable(
+                f"Reality DB circuit open after {self.failure_count} failures"
+            )
+
+    def record_success(self):
+        with self.lock:
+            self.failure_count = 0
+            self.opened_at = None
+            self.trial_started_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failure_count += 1
+            if self.failure_count >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self.trial_started_at = None
+
+
+class RealityDBConnectionPool:
+    """
+    Keeps up to size idle Reality DB connections around for reuse.
+    Connections are pinged before being handed out, and ones that were
+    in use when an error happened are closed instead of going back to
+    the pool, since they may hold an unread result
+    """
+
+    def __init__(self, size=2, circuit_breaker=None, connect=None):
+        self.idle_connections = queue.LifoQueue(maxsize=size)
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        # stand-in databases like the benchmark's pass their own
+        self.connect = connect
+
+    @contextlib.contextmanager
+    def connection(self):
+        connection = self.acquire()
+        try:
+            yield connection
+        except BaseException:
+            connection.close()
+            raise
+        else:
+            self.release(connection)
+
+    def acquire(self):
+        self.circuit_breaker.check()
+        try:
+            connection = self.idle_connections.get_nowait()
+        except queue.Empty:
+            connection = None
+        try:
+            if connection is None:
+                connection = (self.connect or connect)()
+            else:
+                connection.ping(reconnect=True)
+        except REALITY_DB_RETRYABLE_ERRORS:
+            self.circuit_breaker.record_failure()
+            raise
+        self.circuit_breaker.record_success()
+        return connection
+
+    def release(self, connection):
+        try:
+            self.idle_connections.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def close(self):
+        while True:
+            try:
+                self.idle_connections.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        # connections can't be shared with forked celery workers, so each
+        # process gets its own pool
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = RealityDBConnectionPool(
+                size=getattr(settings, "REALITY_DB_POOL_SIZE", 2),
+                circuit_breaker=CircuitBreaker(
+                    failure_threshold=getattr(
+                        settings, "REALITY_DB_CIRCUIT_BREAKER_THRESHOLD", 5
+                    ),
+                    reset_timeout=getattr(
+                        settings, "REALITY_DB_CIRCUIT_BREAKER_TIMEOUT", 60
+                    ),
+                ),
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+@contextlib.contextmanager
+def override_pool(pool):
+    """
+    Routes Reality DB access of this process through pool while active
+    """
+    global _pool, _pool_pid
+    previous_pool, previous_pool_pid = _pool, _pool_pid
+    with _pool_lock:
+        _pool, _pool_pid = pool, os.getpid()
+    try:
+        yield pool
+    finally:
+        pool.close()
+        with _pool_lock:
+            _pool, _pool_pid = previous_pool, previous_pool_pid
+
+
+def reality_db_connection():
+    """
+    with reality_db_connection() as connection:
+        with connection.cursor() as cursor:
+            guarded_cursor_execute(cursor, "SELECT ...")
+    """
+    return get_pool().connection()
+
+
+def connect():
+    # a streamed result is only read as fast as the ingest writes it, and MySQL
+    # drops a result stream left unread for net_write_timeout seconds (60 by
+    # default). init_command also runs again on ping(reconnect=True)
+    net_timeout = getattr(settings, "REALITY_DB_NET_TIMEOUT", 3600)
+    return pymysql.connect(
+        host=settings.REALITY_DB_HOST,
+        user=settings.REALITY_DB_USER,
+        password=settings.REALITY_DB_PASSWORD,
+        database=settings.REALITY_DB_NAME,
+        cursorclass=pymysql.cursors.DictCursor,
+        connect_timeout=getattr(settings, "REALITY_DB_CONNECT_TIMEOUT", 10),
+        read_timeout=getattr(settings, "REALITY_DB_READ_TIMEOUT", 600),
+        init_command=(
+            f"SET SESSION net_write_timeout = {int(net_timeout)}, "
+            f"net_read_timeout = {int(net_timeout)}"
+        ),
+    )
+
+
+def get_backoff_delay(attempt, base=5, cap=300):
+    # full jitter, so workers that failed together don't retry together
+    return random.uniform(0, min(base * 2**attempt, cap))
+
+
+def guarded_cursor_execute(cursor, statement, args=None, max_attempts=5):
+    circuit_breaker = get_pool().circuit_breaker
+    for attempt in range(max_attempts):
+        try:
+            if attempt:
+                # a failed reconnect counts as a failed attempt too
+                cursor.connection.ping(reconnect=True)
+            cursor.execute(statement, args)
+        except REALITY_DB_RETRYABLE_ERRORS:
+            circuit_breaker.record_failure()
+            if attempt == max_attempts - 1 or circuit_breaker.is_open:
+                raise
+            time.sleep(get_backoff_delay(attempt))
+        else:
+            circuit_breaker.record_success()
+            break
@@ -0,0 +1,313 @@
+"""
+Synthetic Reality DB rows for benchmarking the ingest, and the stand-in
+databases they are loaded into
+
+    rows_by_table = generate_reality_rows(offices=100, agents=1000, transactions=5000)
+    connection = SQLiteStandInConnection("/tmp/reality.sqlite3")
+    load_reality_rows(connection, rows_by_table)
+"""
+
+import copy
+import datetime
+import random
+import sqlite3
+
+REALITY_TABLE_COLUMNS = {
+    "tblOffices": {
+        "OfficeID": "VARCHAR(64)",
+        "MLSID": "INT",
+        "Office": "VARCHAR(255)",
+        "Address": "VARCHAR(255)",
+        "City": "VARCHAR(64)",
+        "PostalCode": "VARCHAR(16)",
+        "Phone": "VARCHAR(32)",
+        "State": "VARCHAR(8)",
+        "ModifiedDate": "DATETIME",
+    },
+    "tblAgents": {
+        "AgentID": "VARCHAR(64)",
+        "MLSID": "INT",
+        "AgentName": "VARCHAR(255)",
+        "OfficeID": "VARCHAR(64)",
+        "OfficeName": "VARCHAR(255)",
+        "Address": "VARCHAR(255)",
+        "City": "VARCHAR(64)",
+        "Zipcode": "VARCHAR(16)",
+        "State": "VARCHAR(8)",
+        "Email": "VARCHAR(255)",
+        "OfficePhone": "VARCHAR(32)",
+        "AgentPhone": "VARCHAR(32)",
+        "YIB": "VARCHAR(8)",
+        "ModifiedDate": "DATETIME",
+    },
+    "tblTransactions": {
+        "MLSNumber": "VARCHAR(64)",
+        "MLSID": "INT",
+        "HomeAddress": "VARCHAR(255)",
+        "DIST": "VARCHAR(64)",
+        "Community": "VARCHAR(64)",
+        "CITY": "VARCHAR(64)",
+        "COUNTY": "VARCHAR(64)",
+        "ZIPCODE": "VARCHAR(16)",
+        "StateCode": "VARCHAR(8)",
+        "ListPrice": "DOUBLE",
+        "SoldPrice": "DOUBLE",
+        "DOM": "INT",
+        "ClosedDate": "DATE",
+        "LAID": "VARCHAR(64)",
+        "SAID": "VARCHAR(64)",
+        "LOID": "VARCHAR(64)",
+        "SOID": "VARCHAR(64)",
+        "ModifiedDate": "DATETIME",
+    },
+}
+
+# (city, state, zipcode prefix)
+LOCALITIES = [
+    ("Miami", "FL", "331"),
+    ("Orlando", "FL", "328"),
+    ("Austin", "TX", "787"),
+    ("Dallas", "TX", "752"),
+    ("Phoenix", "AZ", "850"),
+    ("Denver", "CO", "802"),
+    ("Atlanta", "GA", "303"),
+    ("Saginaw", "MI", "486"),
+]
+FIRST_NAMES = ["James", "Maria", "Robert", "Linda", "David", "Sofia", "Ahmed", "Chen"]
+LAST_NAMES = ["Smith", "Garcia", "Lee", "Brown", "Nguyen", "Hassan", "Miller", "Clark"]
+STREETS = ["Main", "Oak", "Pine", "Maple", "Cedar", "Lake", "Hill", "Park"]
+OFFICE_SUFFIXES = ["Realty", "Properties", "Real Estate", "Homes", "Group"]
+# what Reality fills unknown references with
+NOT_REPORTED = "N/R"
+
+
+def generate_reality_rows(
+    offices=100,
+    agents=1000,
+    transactions=5000,
+    mls_ids=(900000,),
+    duplicate_rate=0.0,
+    bad_data_rate=0.0,
+    seed=None,
+):
+    """
+    Returns {table_name: rows} shaped like the Reality DB tables. Agents
+    belong to offices of their MLS and transactions reference agents and
+    offices of theirs. bad_data_rate of the rows carry what makes the
+    ingest drop or partially resolve a row: offices named like their
+    address and N/R agent or office references. duplicate_rate of the
+    rows are repeated with the same key
+    """
+    rng = random.Random(seed)
+    now = datetime.datetime(2024, 1, 1)
+
+    def is_bad():
+        return rng.random() < bad_data_rate
+
+    def make_phone():
+        area_code, exchange = rng.randint(201, 989), rng.randint(200, 999)
+        return f"{area_code} {exchange} {rng.randint(0, 9999):04d}"
+
+    def make_address():
+        return f"{rng.randint(1, 9999)} {rng.choice(STREETS)} St"
+
+    def make_modified_date():
+        return now - datetime.timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+
+    office_rows = []
+    for index in range(offices):
+        city, state, zipcode_prefix = rng.choice(LOCALITIES)
+        address = make_address()
+        office_rows.append(
+            {
+                "OfficeID": f"O{index:07d}",
+                "MLSID": mls_ids[index % len(mls_ids)],
+                "Office": (
+                    address
+                    if is_bad()
+                    else f"{rng.choice(LAST_NAMES)} {rng.choice(OFFICE_SUFFIXES)}"
+                ),
+                "Address": address,
+                "City": city,
+                "PostalCode": f"{zipcode_prefix}{rng.randint(0, 99):02d}",
+                "Phone": make_phone(),
+                "State": state,
+                "ModifiedDate": make_modified_date(),
+            }
+        )
+
+    agent_rows = []
+    for index in range(agents):
+        office = rng.choice(office_rows)
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        agent_rows.append(
+            {
+                "AgentID": f"A{index:07d}",
+                "MLSID": office["MLSID"],
+                "AgentName": f"{first_name} {last_name}".upper(),
+                "OfficeID": NOT_REPORTED if is_bad() else office["OfficeID"],
+                "OfficeName": office["Office"],
+                "Address": office["Address"],
+                "City": office["City"],
+                "Zipcode": office["PostalCode"],
+                "State": office["State"],
+                "Email": f"{first_name}.{last_name}{index}@example.com",
+                "OfficePhone": office["Phone"],
+                "AgentPhone": make_phone(),
+                "YIB": str(rng.randint(0, 40)),
+                "ModifiedDate": make_modified_date(),
+            }
+        )
+
+    transaction_rows = []
+    for index in range(transactions):
+        listing_agent = rng.choice(agent_rows)
+        selling_agent = rng.choice(agent_rows)
+        city, state, zipcode_prefix = rng.choice(LOCALITIES)
+        list_price = rng.randint(80, 2000) * 1000.0
+        transaction_rows.append(
+            {
+                "MLSNumber": f"T{index:08d}",
+                "MLSID": listing_agent["MLSID"],
+                "HomeAddress": make_address(),
+                "DIST": NOT_REPORTED,
+                "Community": NOT_REPORTED,
+                "CITY": city,
+                "COUNTY": city.upper(),
+                "ZIPCODE": f"{zipcode_prefix}{rng.randint(0, 99):02d}",
+                "StateCode": state,
+                "ListPrice": list_price,
+                "SoldPrice": round(list_price * rng.uniform(0.9, 1.05), -2),
+                "DOM": rng.randint(0, 180),
+                "ClosedDate": (
+                    now - datetime.timedelta(days=rng.randint(0, 730))
+                ).date(),
+                "LAID": NOT_REPORTED if is_bad() else listing_agent["AgentID"],
+                "SAID": selling_agent["AgentID"],
+                "LOID": listing_agent["OfficeID"],
+                "SOID": NOT_REPORTED if is_bad() else selling_agent["OfficeID"],
+                "ModifiedDate": make_modified_date(),
+            }
+        )
+
+    rows_by_table = {
+        "tblOffices": office_rows,
+        "tblAgents": agent_rows,
+        "tblTransactions": transaction_rows,
+    }
+    for rows in rows_by_table.values():
+        rows.extend([copy.copy(row) for row in rows if rng.random() < duplicate_rate])
+        rng.shuffle(rows)
+    return rows_by_table
+
+
+def change_reality_rows(rows_by_table, change_rate, seed=None):
+    """
+    Returns a copy of rows_by_table where change_rate of the agents and
+    transactions were edited and had their ModifiedDate bumped, like a
+    day of Reality updates. Offices are left alone since changing them
+    syncs to HubSpot
+    """
+    rng = random.Random(seed)
+    changed_rows_by_table = {
+        table_name: [copy.copy(row) for row in rows]
+        for table_name, rows in rows_by_table.items()
+    }
+    modified_date = max(
+        row["ModifiedDate"] for rows in rows_by_table.values() for row in rows
+    ) + datetime.timedelta(days=1)
+    for row in changed_rows_by_table["tblAgents"]:
+        if rng.random() < change_rate:
+            row["YIB"] = str(int(row["YIB"]) + 1)
+            row["ModifiedDate"] = modified_date
+    for row in changed_rows_by_table["tblTransactions"]:
+        if rng.random() < change_rate:
+            row["SoldPrice"] += 1000
+            row["ModifiedDate"] = modified_date
+    return changed_rows_by_table
+
+
+def load_reality_rows(connection, rows_by_table):
+    """
+    (Re)creates the Reality tables in connection, a pymysql connection to a
+    scratch database or a SQLiteStandInConnection, and inserts the rows
+    """
+    with connection.cursor() as cursor:
+        for table_name, columns in REALITY_TABLE_COLUMNS.items():
+            cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+            cursor.execute(
+                f"CREATE TABLE {table_name} ("
+                + ", ".join(f"{column} {type_}" for column, type_ in columns.items())
+                + ")"
+            )
+            cursor.executemany(
+                f"INSERT INTO {table_name} ({', '.join(columns)}) "
+                f"VALUES ({', '.join(['%s'] * len(columns))})",
+                [
+                    [row[column] for column in columns]
+                    for row in rows_by_table.get(table_name, [])
+                ],
+            )
+    connection.commit()
+
+
+class SQLiteStandInConnection:
+    """
+    The subset of a pymysql connection the ingest uses, over SQLite, so the
+    ingest can be benchmarked without a MySQL server. Rows come back as
+    dicts and %s placeholders are translated. Dates are stored as ISO
+    strings, which the ingest handles like the date objects MySQL returns
+    """
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+
+    def cursor(self, cursorclass=None):
+        return SQLiteStandInCursor(self)
+
+    def ping(self, reconnect=True):
+        pass
+
+    def commit(self):
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+class SQLiteStandInCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.cursor = connection.connection.cursor()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.cursor.close()
+
+    def execute(self, statement, args=None):
+        self.cursor.execute(
+            statement.replace("%s", "?"), [get_sqlite_value(arg) for arg in args or ()]
+        )
+
+    def executemany(self, statement, many_args):
+        self.cursor.executemany(
+            statement.replace("%s", "?"),
+            ([get_sqlite_value(arg) for arg in args] for args in many_args),
+        )
+
+    def fetchmany(self, size):
+        return [dict(row) for row in self.cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [dict(row) for row in self.cursor.fetchall()]
+
+
+def get_sqlite_value(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return value
@@ -1,14 +1,18 @@
+import contextlib
 import csv
 import datetime
+import logging
 import time
 import typing
 
 import isodate
 import pymysql.cursors
-import pymysql.err
-from celery import shared_task
+from celery import chain, group, shared_task
 from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import F, Q
 from django.db.utils import IntegrityError
+from django.utils import timezone
 from hubspot.crm.companies import (
     SimplePublicObjectInputForCreate as HubSpotCompanyInputForCreate,
 )
@@ -19,50 +23,184 @@ from hubspot.crm.contacts.exceptions import ApiException as HubSpotContactsApiEx
 
 from smartsetter_utils.aws_utils import download_s3_file
 from smartsetter_utils.core import Environments
+
 #from smartsetter_utils.geo_utils import geocode_address, query_location_for_zipcode
 from smartsetter_utils.geo_utils import query_location_for_zipcode
 from smartsetter_utils.hubspot.utils import get_hubspot_client
+from smartsetter_utils.ssot.copy_loader import StagingCopyLoader
 from smartsetter_utils.ssot.models import (
     MLS,
     Agent,
+    AgentMaterializedViewRefresh,
     Brand,
+    DirtyAgent,
+    DirtyMLS,
+    DirtyOffice,
+    IngestRun,
     Office,
+    RealityTableWatermark,
     Transaction,
     Zipcode,
+    ZipcodeLocation,
 )
+from smartsetter_utils.ssot.models.base_models import RealityForeignKeyResolver
 from smartsetter_utils.ssot.models.brand import cached_brands
 from smartsetter_utils.ssot.models.office import BadDataException
-from smartsetter_utils.ssot.utils import format_phone, get_reality_db_hubspot_client
+from smartsetter_utils.ssot.models.transaction import get_12m_start_date
+from smartsetter_utils.ssot.pipeline import IngestPipeline
+from smartsetter_utils.ssot.reality_db import (
+    REALITY_DB_RETRYABLE_ERRORS,
+    get_backoff_delay,
+    guarded_cursor_execute,
+    reality_db_connection,
+)
+from smartsetter_utils.ssot.utils import get_reality_db_hubspot_client, phone_normalizer
+
+logger = logging.getLogger(__name__)
 
 
 @shared_task
-def import_from_reality_db():
+def import_from_reality_db(sharded=True, concurrency=None, copy=True):
+    # copy loads through a COPY-filled staging table, fit for an empty database
     MLS.import_from_s3()
     Brand.create_from_mapping_sheet()
 
-    iterate_all_create_in_batches(ModelClassMapper.office_id)
-    # warning: doesn't assign brands to agents. Use pull_reality_db_updates instead
-    iterate_all_create_in_batches(ModelClassMapper.agent_id)
-    iterate_all_create_in_batches(ModelClassMapper.transaction_id)
-    Agent.objects.update_cached_stats()
+    run = IngestRun.objects.create(
+        kind=IngestRun.KIND_CHOICES.create, copy=copy, sharded=sharded
+    )
+    run_reality_db_ingest(run, concurrency)
 
 
 @shared_task(name="ssot.pull_reality_db_updates")
-def pull_reality_db_updates(force=False):
+def pull_reality_db_updates(force=False, full=False, sharded=True, concurrency=None):
     # force allows to run without hubspot updates
+    # full ignores the stored watermarks and rescans whole tables to reconcile
     if Environments.is_dev() and not force:
         return
 
-    update_or_create_items(ModelClassMapper.office_id)
-    update_or_create_items(ModelClassMapper.agent_id)
-    update_or_create_items(ModelClassMapper.transaction_id)
-    Agent.objects.update_cached_stats()
+    run = IngestRun.objects.create(
+        kind=IngestRun.KIND_CHOICES.pull, full=full, sharded=sharded
+    )
+    run_reality_db_ingest(run, concurrency)
+
+
+@shared_task
+def resume_ingest_run(run_id, concurrency=None):
+    # tables and shards already completed by the run are skipped, the others
+    # continue from their last checkpoint
+    run_reality_db_ingest(IngestRun.objects.get(id=run_id), concurrency)
+
+
+def run_reality_db_ingest(run: IngestRun, concurrency=None):
+    if run.sharded:
+        dispatch_reality_db_shards(run, concurrency)
+        return
+
+    run.expected_checkpoint_count = len(ModelClassMapper.ingest_order) + 1
+    run.save(update_fields=["expected_checkpoint_count", "modified"])
+    run_ingest_stages(run)
+    refresh_stale_agent_materialized_views()
+
+
+def dispatch_reality_db_shards(run: IngestRun, concurrency=None):
+    """
+    Runs one ingest_reality_db_shard task per MLSID. Shards are spread over
+    `concurrency` chains so at most that many run at the same time
+    """
+    concurrency = concurrency or getattr(settings, "REALITY_DB_INGEST_CONCURRENCY", 4)
+    mls_ids = get_reality_mls_ids()
+    run.expected_checkpoint_count = len(mls_ids) * (
+        len(ModelClassMapper.ingest_order) + 1
+    )
+    run.save(update_fields=["expected_checkpoint_count", "modified"])
+    return apply_in_lanes(
+        [ingest_reality_db_shard.si(mls_id, run.id) for mls_id in mls_ids],
+        concurrency,
+    )
 
 
-def handle_before_office_created(office: Office):
-    office.location = get_location_from_zipcode_or_address(
-        office.zipcode, office.address
+def apply_in_lanes(signatures, concurrency):
+    """
+    Runs the task signatures spread over `concurrency` chains, so at most
+    that many run at the same time. A chain stops at its first failed task,
+    so the tasks have to log their errors rather than raise them
+    """
+    lanes = [signatures[lane_index::concurrency] for lane_index in range(concurrency)]
+    return group(chain(*lane) for lane in lanes if lane).apply_async()
+
+
+@shared_task(bind=True, max_retries=5)
+def ingest_reality_db_shard(self, mls_id, run_id):
+    try:
+        run_reality_db_shard(IngestRun.objects.get(id=run_id), mls_id)
+    except Exception as exc:
+        if (
+            isinstance(exc, REALITY_DB_RETRYABLE_ERRORS)
+            and self.request.retries < self.max_retries
+        ):
+            raise self.retry(
+                exc=exc,
+                countdown=get_backoff_delay(self.request.retries, base=60, cap=30 * 60),
+            )
+        # raising would stop the shard's lane and skip the shards after it.
+        # The run stays unfinished, so resume_ingest_run picks it up again
+        logger.exception("Ingest run %s failed on shard %s", run_id, mls_id)
+
+
+def run_reality_db_shard(run: IngestRun, mls_id):
+    # agent and transaction ids embed the MLSID, so a shard never references
+    # rows of another shard and only the order inside a shard matters
+    run_ingest_stages(run, mls_id)
+    # the shard's lane already bounds how many refreshes run at once
+    if DirtyMLS.objects.filter(mls_id=str(mls_id)).exists():
+        refresh_agent_materialized_view(str(mls_id))
+
+
+def run_ingest_stages(run: IngestRun, mls_id=None):
+    """
+    Loads the tables and then runs the post-ingest stages, which have a
+    checkpoint of their own. A retry after a failed stage skips the tables
+    completed by the earlier attempt but runs the stages again
+    """
+    post_ingest_checkpoint = run.get_post_ingest_checkpoint(
+        str(mls_id) if mls_id is not None else ""
     )
+    if post_ingest_checkpoint.completed:
+        return
+    ingest_reality_db_tables(run, mls_id)
+    geocode_missing_locations(mls_id)
+    update_run_cached_stats(run, mls_id)
+    post_ingest_checkpoint.complete()
+    run.finish_if_completed()
+
+
+def ingest_reality_db_tables(run: IngestRun, mls_id=None):
+    for model_class_id in ModelClassMapper.ingest_order:
+        if run.kind == IngestRun.KIND_CHOICES.create:
+            iterate_all_create_in_batches(
+                model_class_id, mls_id=mls_id, copy=run.copy, run_id=run.id
+            )
+        else:
+            update_or_create_items(
+                model_class_id, run.full, mls_id=mls_id, run_id=run.id
+            )
+
+
+def get_reality_mls_ids():
+    with reality_db_connection() as connection, connection.cursor() as cursor:
+        guarded_cursor_execute(
+            cursor,
+            " UNION ".join(
+                f"SELECT DISTINCT MLSID FROM {ModelClass.reality_table_name}"
+                for ModelClass in (Office, Agent, Transaction)
+            ),
+        )
+        invisible_mls_ids = set(MLS.objects.invisible().values_list("id", flat=True))
+        return sorted(
+            row["MLSID"]
+            for row in cursor.fetchall()
+            if str(row["MLSID"]) not in invisible_mls_ids
+        )
 
 
 @shared_task
@@ -84,8 +222,6 @@ def handle_agent_created(agent_id, agent: typing.Optional[Agent] = None):
         if agent.brand:
             break
 
-    agent.location = get_location_from_zipcode_or_address(agent.zipcode, agent.address)
-
     if not agent.state and agent.zipcode:
         try:
             zipcode = Zipcode.objects.get(zipcode=agent.zipcode)
@@ -94,13 +230,8 @@ def handle_agent_created(agent_id, agent: typing.Optional[Agent] = None):
             pass
 
     agent.save()
-
-
-@shared_task
-def handle_before_transaction_created(transaction: Transaction):
-    transaction.location = get_location_from_zipcode_or_address(
-        transaction.zipcode, transaction.address
-    )
+    if not agent.location and agent.zipcode:
+        geocode_missing_locations(model_class_id=ModelClassMapper.agent_id, id=agent.id)
 
 
 @shared_task
@@ -133,14 +264,23 @@ def verify_agent_phones_from_validated_phones_sheet():
     validated_phones_csv_reader = csv.DictReader(
         open(validated_phones_file.name, newline="")
     )
-    for row in validated_phones_csv_reader:
-        if row["line type"] == "CELL PHONE":
-            formatted_phone = format_phone(row["phone number"])
-            if formatted_phone:
-                Agent.objects.filter(phone=formatted_phone).update(
-                    verified_phone=formatted_phone,
-                    verified_phone_source=Agent.PHONE_VERIFIED_SOURCE_SHEET,
-                )
+    formatted_phones = list(
+        set(
+            phone_normalizer.normalize_many(
+                row["phone number"]
+                for row in validated_phones_csv_reader
+                if row["line type"] == "CELL PHONE"
+            )
+        )
+        - {None}
+    )
+    for batch_start in range(0, len(formatted_phones), 1000):
+        Agent.objects.filter(
+            phone__in=formatted_phones[batch_start : batch_start + 1000]
+        ).update(
+            verified_phone=F("phone"),
+            verified_phone_source=Agent.PHONE_VERIFIED_SOURCE_SHEET,
+        )
 
 
 @shared_task
@@ -161,15 +301,20 @@ def populate_hubspot_database(limit=None):
         offices = offices[:limit]
 
     hubspot_contacts_csv = download_s3_file("hubspot_contacts_oct_28.csv")
-    hubspot_contacts_csv_reader = csv.DictReader(
-        open(hubspot_contacts_csv.name, newline="")
-    )
+    hubspot_contacts = list(csv.DictReader(open(hubspot_contacts_csv.name, newline="")))
     contact_email_to_data_map = {
-        contact["Email"]: contact for contact in hubspot_contacts_csv_reader
+        contact["Email"]: contact for contact in hubspot_contacts
     }
+    # blank or unparseable phones all normalize to None, which mustn't match
     contact_phone_to_data_map = {
-        format_phone(contact["Phone Number"]): contact
-        for contact in hubspot_contacts_csv_reader
+        phone: contact
+        for phone, contact in zip(
+            phone_normalizer.normalize_many(
+                contact["Phone Number"] for contact in hubspot_contacts
+            ),
+            hubspot_contacts,
+        )
+        if phone
     }
 
     for office in offices:
@@ -183,7 +328,7 @@ def populate_hubspot_database(limit=None):
         agents = Agent.objects.filter(office=office)
         for agent in agents:
             email_match = contact_email_to_data_map.get(agent.email)
-            phone_match = contact_phone_to_data_map.get(agent.phone)
+            phone_match = agent.phone and contact_phone_to_data_map.get(agent.phone)
             match = email_match or phone_match
             if match:
                 try:
@@ -194,7 +339,9 @@ def populate_hubspot_database(limit=None):
                                 "lastname": match["Last Name"],
                                 "email": match["Email"],
                                 "hs_lead_status": match["Lead Status"],
-                                "phone": format_phone(match["Phone Number"]),
+                                "phone": phone_normalizer.normalize(
+                                    match["Phone Number"]
+                                ),
                                 "state": match["State/Region"],
                                 "city": match["City"],
                                 "zip": match["Postal Code"],
@@ -228,28 +375,146 @@ def populate_hubspot_database(limit=None):
 
 
 @shared_task
-def iterate_all_create_in_batches(model_class_name: str):
+def iterate_all_create_in_batches(
+    model_class_name: str,
+    stream=True,
+    mls_id=None,
+    copy=False,
+    pipelined=True,
+    run_id=None,
+):
     ModelClass = ModelClassMapper.get_model_class_from_id(model_class_name)
-    connection = get_reality_db_connection()
-    with connection.cursor() as cursor:
-        guarded_cursor_execute(cursor, f"SELECT * FROM {ModelClass.reality_table_name}")
-        # this fetchmany doesn't reduce memory usage because all data
-        # has been fetched already
-        while many_fetched := cursor.fetchmany(1000):
-            instances = []
-            for reality_dict in many_fetched:
-                try:
-                    instances.append(ModelClass.from_reality_dict(reality_dict))
-                except BadDataException:
-                    continue
+    counts = {"created": 0, "failed": 0, "duplicates": 0}
+    checkpoint = get_ingest_checkpoint(run_id, ModelClass, mls_id)
+    if checkpoint and checkpoint.completed:
+        return counts
+    phone_normalizer.reset_stats()
+    # the staging table doesn't survive a failed attempt, so a copy
+    # load restarts the table from the beginning
+    after_key = checkpoint.last_key if checkpoint and not copy else None
+    copy_loader = StagingCopyLoader(ModelClass) if copy else None
+    # an unbuffered cursor keeps the rows on the MySQL side until fetched,
+    # so memory is bounded by the batch size instead of the table size
+    cursorclass = pymysql.cursors.SSDictCursor if stream else pymysql.cursors.DictCursor
+    statement, args = get_reality_select_statement(
+        ModelClass,
+        mls_id=mls_id,
+        after_key=after_key,
+        ordered=bool(checkpoint) and not copy,
+    )
+    key_fields = ModelClass.get_reality_key_fields(sharded=mls_id is not None)
+
+    def read():
+        with reality_db_connection() as connection:
+            with connection.cursor(cursorclass) as cursor:
+                guarded_cursor_execute(cursor, statement, args)
+                yield from fetch_in_batches(cursor, key_fields=key_fields)
+
+    def transform(many_fetched):
+        reality_dicts, duplicate_count = deduplicate_reality_dicts(
+            ModelClass, many_fetched
+        )
+        fk_resolver = RealityForeignKeyResolver().preload(ModelClass, reality_dicts)
+        instances = []
+        for reality_dict in reality_dicts:
             try:
-                ModelClass.objects.bulk_create(instances)
-            except IntegrityError:
-                for instance in instances:
-                    try:
-                        instance.save()
-                    except IntegrityError:
-                        continue
+                instances.append(
+                    ModelClass.from_reality_dict(reality_dict, fk_resolver)
+                )
+            except BadDataException:
+                continue
+        return (
+            instances,
+            duplicate_count,
+            get_reality_key(many_fetched[-1], key_fields),
+        )
+
+    def write(transformed):
+        instances, duplicate_count, last_key = transformed
+        counts["duplicates"] += duplicate_count
+        if copy_loader:
+            copy_loader.copy(instances)
+            return
+        if instances:
+            created, failed = ModelClass.objects.bulk_create_bisecting(instances)
+            counts["created"] += len(created)
+            counts["failed"] += len(failed)
+            for instance, exc in failed:
+                logger.warning(
+                    "Couldn't create %s %s: %s", ModelClass.__name__, instance.id, exc
+                )
+        if checkpoint:
+            checkpoint.advance(last_key, duplicate_count)
+
+    with copy_loader or contextlib.nullcontext():
+        IngestPipeline(read, transform, write, threaded=pipelined).run()
+        if copy_loader:
+            counts["created"] = copy_loader.merge()
+            # duplicate or already existing ids
+            counts["failed"] = copy_loader.staged_count - counts["created"]
+            if counts["failed"]:
+                logger.warning(
+                    "Skipped %s %s rows with duplicate ids",
+                    counts["failed"],
+                    ModelClass.__name__,
+                )
+    if checkpoint:
+        checkpoint.complete()
+    log_duplicate_count(ModelClass, counts["duplicates"])
+    log_phone_cache_stats(ModelClass)
+    return counts
+
+
+def get_zipcode_location(zipcode):
+    """
+    Looks zipcode up in Elasticsearch unless ZipcodeLocation already has it,
+    or had it unresolved less than RETRY_UNRESOLVED_AFTER ago
+    """
+    zipcode_location = ZipcodeLocation.objects.filter(zipcode=zipcode).first()
+    if zipcode_location and (
+        zipcode_location.location
+        or zipcode_location.modified
+        > timezone.now() - ZipcodeLocation.RETRY_UNRESOLVED_AFTER
+    ):
+        return zipcode_location.location
+    location = query_location_for_zipcode(zipcode)
+    ZipcodeLocation.objects.update_or_create(
+        zipcode=zipcode, defaults={"location": location}
+    )
+    return location
+
+
+@shared_task
+def geocode_missing_locations(mls_id=None, model_class_id=None, id=None):
+    """
+    Fills the location of rows created without one, or only of the row with
+    id when model_class_id is given, as creation hooks of single rows do.
+    Each distinct zipcode is looked up once and written to all rows sharing
+    it with one UPDATE, so it costs the same whether the rows came from
+    bulk_create, COPY or save.
+    Lookups go through ZipcodeLocation, so zipcodes Elasticsearch has no
+    location for aren't looked up again on every run
+    """
+    if Environments.is_dev():
+        return
+    if model_class_id is None:
+        model_classes = (Office, Agent, Transaction)
+    else:
+        model_classes = (ModelClassMapper.get_model_class_from_id(model_class_id),)
+    locations = {}
+    for ModelClass in model_classes:
+        queryset = ModelClass.objects.filter(location__isnull=True).exclude(
+            Q(zipcode__isnull=True) | Q(zipcode="")
+        )
+        if mls_id is not None:
+            queryset = queryset.filter(mls_id=mls_id)
+        if id is not None:
+            queryset = queryset.filter(id=id)
+        for zipcode in queryset.values_list("zipcode", flat=True).distinct().order_by():
+            if zipcode not in locations:
+                locations[zipcode] = get_zipcode_location(zipcode)
+            if locations[zipcode]:
+                queryset.filter(zipcode=zipcode).update(location=locations[zipcode])
 
 
 @shared_task
@@ -257,60 +522,397 @@ def update_agent_cached_stats(mls_id):
     Agent.objects.filter(mls_id=mls_id).update_cached_stats()
 
 
+def update_run_cached_stats(run: IngestRun, mls_id=None):
+    # initial imports touch every row, pulls only the ones marked dirty
+    if run.kind == IngestRun.KIND_CHOICES.create:
+        for ModelClass in (Agent, Office):
+            queryset = ModelClass.objects.all()
+            if mls_id is not None:
+                queryset = queryset.filter(mls_id=mls_id)
+            queryset.update_cached_stats()
+    else:
+        update_dirty_agent_cached_stats(mls_id)
+        update_dirty_office_cached_stats(mls_id)
+
+
+@shared_task
+def update_dirty_agent_cached_stats(mls_id=None, batch_size=5000):
+    update_dirty_cached_stats(DirtyAgent, Agent, mls_id, batch_size)
+
+
+@shared_task
+def update_dirty_office_cached_stats(mls_id=None, batch_size=5000):
+    update_dirty_cached_stats(DirtyOffice, Office, mls_id, batch_size)
+
+
+def update_dirty_cached_stats(DirtyModel, ModelClass, mls_id=None, batch_size=5000):
+    """
+    Recomputes the stats of the rows marked dirty by the ingest, so a pull
+    costs in proportion to the transactions it changed rather than to the
+    number of agents or offices. Dirty rows are locked with SKIP LOCKED,
+    letting concurrent shards and the roll-off pass split the work
+    """
+    dirty_rows = DirtyModel.objects.all()
+    if mls_id is not None:
+        dirty_rows = dirty_rows.filter(
+            pk__in=ModelClass.objects.filter(mls_id=mls_id).values("id")
+        )
+    while True:
+        with db_transaction.atomic():
+            ids = list(
+                dirty_rows.select_for_update(skip_locked=True).values_list(
+                    "pk", flat=True
+                )[:batch_size]
+            )
+            if not ids:
+                return
+            ModelClass.objects.filter(id__in=ids).update_cached_stats()
+            DirtyModel.objects.filter(pk__in=ids).delete()
+
+
+@shared_task(name="ssot.roll_off_agent_cached_stats")
+def roll_off_agent_cached_stats(days=1):
+    """
+    Daily pass for the agents whose transactions left the 12 month window
+    in the last `days` days. No ingest touches those transactions, so
+    nothing else marks their agents dirty. Run with more days to catch up
+    after skipped runs
+    """
+    window_start_date = get_12m_start_date()
+    DirtyAgent.mark(
+        agent_id
+        for agent_ids in Transaction.objects.filter(
+            closed_date__gte=window_start_date - datetime.timedelta(days=days),
+            closed_date__lt=window_start_date,
+        ).values_list(*[f"{field_name}_id" for field_name in Transaction.AGENT_FIELDS])
+        for agent_id in agent_ids
+    )
+    update_dirty_agent_cached_stats()
+    refresh_stale_agent_materialized_views()
+
+
+@shared_task(name="ssot.refresh_stale_agent_materialized_views")
+def refresh_stale_agent_materialized_views(concurrency=None):
+    """
+    Refreshes the agent materialized views of the MLSs the ingest wrote agent
+    rows of, at most `concurrency` at a time since each holds a Postgres
+    session for its whole refresh. Views of untouched MLSs aren't refreshed
+    """
+    concurrency = concurrency or getattr(
+        settings, "AGENT_MATERIALIZED_VIEW_REFRESH_CONCURRENCY", 4
+    )
+    mls_ids = sorted(DirtyMLS.objects.values_list("mls_id", flat=True))
+    return apply_in_lanes(
+        [refresh_agent_materialized_view.si(mls_id) for mls_id in mls_ids],
+        concurrency,
+    )
+
+
+@shared_task
+def refresh_agent_materialized_view(mls_id):
+    # unmarked first, so agent rows written during the refresh mark it again
+    DirtyMLS.objects.filter(mls_id=mls_id).delete()
+    mls = MLS.objects.filter(id=mls_id).first()
+    if not mls or not mls.agent_materialized_view_exists():
+        return
+    start_time = time.perf_counter()
+    try:
+        mls.refresh_agent_materialized_view()
+    except Exception:
+        # left marked for the next pass. Raising would stop the refresh lane
+        # and skip the views after this one
+        DirtyMLS.mark([mls_id])
+        logger.exception(
+            "Couldn't refresh the agent materialized view of MLS %s", mls_id
+        )
+        return
+    AgentMaterializedViewRefresh.objects.create(
+        mls=mls,
+        duration=datetime.timedelta(seconds=time.perf_counter() - start_time),
+        row_count=mls.get_agent_materialized_view_row_count(),
+    )
+
+
 @shared_task
-def update_or_create_items(model_class_id):
+def update_or_create_items(
+    model_class_id, full=False, mls_id=None, pipelined=True, run_id=None
+):
     ModelClass = ModelClassMapper.get_model_class_from_id(model_class_id)
-    connection = get_reality_db_connection()
-    with connection.cursor() as cursor:
-        guarded_cursor_execute(cursor, f"SELECT * FROM {ModelClass.reality_table_name}")
-        for reality_dict in cursor.fetchall():
-            item_id = ModelClass.get_id_from_reality_dict(reality_dict)
+    checkpoint = get_ingest_checkpoint(run_id, ModelClass, mls_id)
+    if checkpoint and checkpoint.completed:
+        return
+    phone_normalizer.reset_stats()
+    watermark_field = ModelClass.get_reality_watermark_field()
+    # shards keep their own watermark so they can progress independently
+    shard = str(mls_id) if mls_id is not None else ""
+    watermark = (
+        None if full else RealityTableWatermark.get_value_for_model(ModelClass, shard)
+    )
+    statement, args = get_reality_select_statement(
+        ModelClass,
+        watermark,
+        mls_id,
+        after_key=checkpoint and checkpoint.last_key,
+        ordered=bool(checkpoint),
+    )
+    key_fields = ModelClass.get_reality_key_fields(sharded=mls_id is not None)
+    max_watermark = None
+    total_duplicate_count = 0
+
+    def read():
+        with reality_db_connection() as connection, connection.cursor() as cursor:
+            guarded_cursor_execute(cursor, statement, args)
+            yield from fetch_in_batches(cursor, key_fields=key_fields)
+
+    def transform(many_fetched):
+        nonlocal max_watermark
+        reality_dicts, duplicate_count = deduplicate_reality_dicts(
+            ModelClass, many_fetched
+        )
+        fk_resolver = RealityForeignKeyResolver().preload(ModelClass, reality_dicts)
+        instances = []
+        update_fields = None
+        for reality_dict in reality_dicts:
+            if watermark_field:
+                row_watermark = reality_dict[watermark_field]
+                if row_watermark is not None and (
+                    max_watermark is None or row_watermark > max_watermark
+                ):
+                    max_watermark = row_watermark
             try:
-                ModelClass.objects.update_or_create(
-                    id=item_id,
-                    defaults=ModelClass.get_property_dict_from_reality_dict(
-                        reality_dict
-                    ),
+                property_dict = ModelClass.get_property_dict_from_reality_dict(
+                    reality_dict, fk_resolver
                 )
             except BadDataException:
                 continue
+            instances.append(
+                ModelClass(
+                    id=ModelClass.get_id_from_reality_dict(reality_dict),
+                    source_hash=ModelClass.get_reality_hash(property_dict),
+                    **property_dict,
+                )
+            )
+            update_fields = [*property_dict.keys(), "source_hash", "modified"]
+        return (
+            instances,
+            update_fields,
+            duplicate_count,
+            get_reality_key(many_fetched[-1], key_fields),
+        )
 
+    def write(transformed):
+        nonlocal total_duplicate_count
+        instances, update_fields, duplicate_count, last_key = transformed
+        total_duplicate_count += duplicate_count
+        if instances:
+            upsert_reality_instances(ModelClass, instances, update_fields)
+        if checkpoint:
+            checkpoint.advance(last_key, duplicate_count)
+
+    IngestPipeline(read, transform, write, threaded=pipelined).run()
+    # only advanced once the whole table went through so a failed run is retried.
+    # a resumed run only saw the rows after its checkpoint, which can only
+    # hold the watermark back, never skip rows
+    RealityTableWatermark.advance_for_model(ModelClass, max_watermark, shard)
+    if checkpoint:
+        checkpoint.complete()
+    log_duplicate_count(ModelClass, total_duplicate_count)
+    log_phone_cache_stats(ModelClass)
+
+
+def deduplicate_reality_dicts(ModelClass, reality_dicts):
+    """
+    Collapses rows of a batch that map to the same id, which would otherwise
+    make bulk_create fall back to saving the batch row by row. The row with
+    the newest watermark field value wins, the last fetched one on ties or
+    without a watermark field. Returns the rows left and how many were dropped
+    """
+    watermark_field = ModelClass.get_reality_watermark_field()
+    reality_dicts_by_id = {}
+    for reality_dict in reality_dicts:
+        item_id = ModelClass.get_id_from_reality_dict(reality_dict)
+        previous_reality_dict = reality_dicts_by_id.get(item_id)
+        if (
+            previous_reality_dict
+            and watermark_field
+            and reality_dict[watermark_field] is not None
+            and previous_reality_dict[watermark_field] is not None
+            and reality_dict[watermark_field] < previous_reality_dict[watermark_field]
+        ):
+            continue
+        reality_dicts_by_id[item_id] = reality_dict
+    return (
+        list(reality_dicts_by_id.values()),
+        len(reality_dicts) - len(reality_dicts_by_id),
+    )
+
+
+def log_duplicate_count(ModelClass, duplicate_count):
+    if duplicate_count:
+        logger.info(
+            "Collapsed %s %s rows sharing an id with another row of their batch",
+            duplicate_count,
+            ModelClass.__name__,
+        )
+
+
+def log_phone_cache_stats(ModelClass):
+    if phone_normalizer.lookup_count:
+        logger.info(
+            "%s phone cache hit ratio %.2f over %s lookups",
+            ModelClass.__name__,
+            phone_normalizer.hit_ratio,
+            phone_normalizer.lookup_count,
+        )
 
-def guarded_cursor_execute(cursor, statement):
-    while True:
-        try:
-            cursor.execute(statement)
-        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
-            time.sleep(30)
-        else:
-            break
 
+def get_ingest_checkpoint(run_id, ModelClass, mls_id=None):
+    if not run_id:
+        return None
+    shard = str(mls_id) if mls_id is not None else ""
+    return IngestRun.objects.get(id=run_id).get_checkpoint(ModelClass, shard)
 
-def get_reality_db_connection():
-    return pymysql.connect(
-        host=settings.REALITY_DB_HOST,
-        user=settings.REALITY_DB_USER,
-        password=settings.REALITY_DB_PASSWORD,
-        database=settings.REALITY_DB_NAME,
-        cursorclass=pymysql.cursors.DictCursor,
+
+def get_reality_key(reality_dict, key_fields):
+    return [reality_dict[key_field] for key_field in key_fields]
+
+
+def upsert_reality_instances(ModelClass, instances, update_fields):
+    previous_hashes = dict(
+        ModelClass.objects.filter(
+            id__in=[instance.id for instance in instances]
+        ).values_list("id", "source_hash")
+    )
+    existing_instances = []
+    new_instances = []
+    for instance in instances:
+        if instance.id in previous_hashes:
+            # unchanged rows are skipped, sparing the write and the hooks
+            if previous_hashes[instance.id] != instance.source_hash:
+                existing_instances.append(instance)
+        else:
+            new_instances.append(instance)
+    ModelClass.handle_bulk_created(create_reality_instances(ModelClass, new_instances))
+    if not existing_instances:
+        return
+    previous_instances = ModelClass.objects.in_bulk(
+        [instance.id for instance in existing_instances]
+    )
+    ModelClass.objects.bulk_upsert(existing_instances, update_fields)
+    ModelClass.handle_bulk_upserted(
+        previous_instances, existing_instances, update_fields
     )
 
 
-def get_location_from_zipcode_or_address(zipcode, address):
-    location = None
-    if zipcode:
-        location = query_location_for_zipcode(zipcode)
+def create_reality_instances(ModelClass, instances):
+    if ModelClass.has_creation_hooks:
+        # bulk_create would skip the hooks
+        created_instances = []
+        for instance in instances:
+            try:
+                instance.save()
+            except IntegrityError:
+                continue
+            created_instances.append(instance)
+        return created_instances
+    created_instances, failed = ModelClass.objects.bulk_create_bisecting(instances)
+    for instance, exc in failed:
+        logger.warning(
+            "Couldn't create %s %s: %s", ModelClass.__name__, instance.id, exc
+        )
+    return created_instances
 
-    # if not location and address:
-    #     location = geocode_address(address, zipcode)
 
-    return location
+def get_reality_select_statement(
+    ModelClass, watermark=None, mls_id=None, after_key=None, ordered=False
+):
+    select_fields = ", ".join(ModelClass.get_reality_select_fields())
+    statement = f"SELECT {select_fields} FROM {ModelClass.reality_table_name}"
+    key_fields = ", ".join(
+        ModelClass.get_reality_key_fields(sharded=mls_id is not None)
+    )
+    conditions, args = get_reality_mls_conditions(ModelClass, mls_id)
+    if watermark is not None:
+        # >= rather than > so rows sharing the watermark value with the last
+        # row of the previous run aren't lost; re-applying them is harmless
+        conditions.append(f"{ModelClass.get_reality_watermark_field()} >= %s")
+        args.append(watermark)
+    if after_key:
+        # keyset pagination from a checkpoint. fetch_in_batches ends batches,
+        # and so checkpoints, on key boundaries, so no row of after_key is left
+        placeholders = ", ".join(["%s"] * len(after_key))
+        conditions.append(f"({key_fields}) > ({placeholders})")
+        args.extend(after_key)
+    if conditions:
+        statement = f"{statement} WHERE {' AND '.join(conditions)}"
+    if ordered:
+        statement = f"{statement} ORDER BY {key_fields}"
+    return statement, args or None
+
+
+def get_reality_mls_conditions(ModelClass, mls_id=None):
+    """
+    MLS filters pushed down to MySQL: rows of invisible MLSs and, for tables
+    with a date column, rows past their MLS's data_available_until aren't
+    transferred at all
+    """
+    conditions = []
+    args = []
+    mlss = MLS.objects.all()
+    if mls_id is not None:
+        conditions.append("MLSID = %s")
+        args.append(mls_id)
+        mlss = mlss.filter(id=mls_id)
+    else:
+        invisible_mls_ids = list(mlss.invisible().values_list("id", flat=True))
+        if invisible_mls_ids:
+            placeholders = ", ".join(["%s"] * len(invisible_mls_ids))
+            conditions.append(f"MLSID NOT IN ({placeholders})")
+            args.extend(invisible_mls_ids)
+    if ModelClass.reality_date_field:
+        for dated_mls_id, data_available_until in mlss.filter(
+            data_available_until__isnull=False
+        ).values_list("id", "data_available_until"):
+            conditions.append(
+                f"NOT (MLSID = %s AND {ModelClass.reality_date_field} > %s)"
+            )
+            args.extend([dated_mls_id, data_available_until])
+    return conditions, args
+
+
+def fetch_in_batches(cursor, batch_size=1000, key_fields=None):
+    """
+    With key_fields, the trailing rows sharing the last key of a batch are
+    held back for the next one. Reality has several rows per key, and a key
+    split across batches would escape deduplication and leave a checkpoint
+    pointing into the middle of it, so resuming after it would skip the
+    key's unread rows. Keys are only adjacent in ordered reads
+    """
+    held_back = []
+    while many_fetched := cursor.fetchmany(batch_size):
+        if not key_fields:
+            yield many_fetched
+            continue
+        many_fetched = held_back + list(many_fetched)
+        last_key = get_reality_key(many_fetched[-1], key_fields)
+        split = len(many_fetched)
+        while (
+            split and get_reality_key(many_fetched[split - 1], key_fields) == last_key
+        ):
+            split -= 1
+        held_back = many_fetched[split:]
+        if split:
+            yield many_fetched[:split]
+    if held_back:
+        yield held_back
 
 
 class ModelClassMapper:
     agent_id = "a"
     office_id = "o"
     transaction_id = "t"
+    # agents reference offices and transactions reference both
+    ingest_order = (office_id, agent_id, transaction_id)
 
     @staticmethod
     def get_model_class_from_id(id):
@@ -54,12 +54,9 @@ class OfficeFactory(factory.django.DjangoModelFactory):
 
     @classmethod
     def _create(cls, model_class, *args, **kwargs):
-        with (
-            patch(
-                "smartsetter_utils.ssot.models.office.get_hubspot_client"
-            ) as mock_hubspot_client,
-            patch("smartsetter_utils.ssot.tasks.handle_before_office_created"),
-        ):
+        with patch(
+            "smartsetter_utils.ssot.models.office.get_hubspot_client"
+        ) as mock_hubspot_client:
             create_return_value = (
                 mock_hubspot_client.return_value.crm.companies.basic_api.create.return_value
             )
@@ -102,11 +99,6 @@ class TransactionFactory(factory.django.DjangoModelFactory):
     class Meta:
         model = Transaction
 
-    @classmethod
-    def _create(cls, model_class, *args, **kwargs):
-        with patch("smartsetter_utils.ssot.tasks.handle_before_transaction_created"):
-            return super()._create(model_class, *args, **kwargs)
-
 
 class AgentOfficeMovementFactory(factory.django.DjangoModelFactory):
     agent = factory.SubFactory(AgentFactory)
@@ -1,7 +1,9 @@
+import datetime
 import json
 from unittest.mock import patch
 
 from dateutil.relativedelta import relativedelta
+from django.db import connection
 from django.utils import timezone
 
 from smartsetter_utils.ssot.models import MLS, Agent, Office
@@ -87,6 +89,24 @@ class TestAgentModel(TestCase):
         )
         self.assertEqual(agent.role, Agent.ROLE_CHOICES.agent)
 
+    def test_update_cached_stats_only_updates_queryset_agents(self):
+        agent = self.make_agent(total_transactions_count=10)
+        other_agent = self.make_agent(total_transactions_count=10)
+        date_12m = timezone.now().date()
+        self.make_transaction(listing_agent=agent, closed_date=date_12m)
+        self.make_transaction(
+            listing_agent=agent, selling_agent=agent, closed_date=date_12m
+        )
+
+        Agent.objects.filter(id=agent.id).update_cached_stats()
+
+        agent.refresh_from_db()
+        other_agent.refresh_from_db()
+        self.assertEqual(agent.listing_transactions_count, 2)
+        self.assertEqual(agent.selling_transactions_count, 1)
+        self.assertEqual(agent.total_transactions_count, 3)
+        self.assertEqual(other_agent.total_transactions_count, 10)
+
     def test_assign_role_other(self):
         agent = self.make_agent(
             raw_data={"MemberType": "wow", "MemberMlsSecurityClass": "Photographer"},
@@ -103,6 +123,74 @@ class TestAgentModel(TestCase):
 
         self.assertEqual(agent.role, Agent.ROLE_CHOICES.other)
 
+    def test_update_roles_matches_assign_role(self):
+        office = self.make_office(office_broker_key="broker-agent")
+        agents = [
+            self.make_agent(id="broker-agent", office=office),
+            self.make_agent(office=office, total_transactions_count=1),
+            self.make_agent(member_type=" Photographer", total_transactions_count=0),
+            self.make_agent(
+                member_mlssecurity_class="assistant", total_transactions_count=0
+            ),
+            self.make_agent(member_type="zzz", total_transactions_count=0),
+        ]
+
+        Agent.objects.update(role=None)
+        Agent.objects.update_roles()
+
+        for agent in agents:
+            agent.assign_role()
+            self.assertEqual(
+                Agent.objects.get(id=agent.id).role, agent.role, agent.member_type
+            )
+
+    def test_get_scores_matches_score_properties(self):
+        office = self.make_office()
+        agents = [
+            self.make_agent(
+                office=office,
+                total_production=0,
+                total_transactions_count=0,
+                tenure=None,
+            ),
+            self.make_agent(
+                office=office,
+                total_production=500_000,
+                total_transactions_count=4,
+                tenure=datetime.timedelta(days=3 * 365 + 100, hours=5),
+            ),
+            self.make_agent(
+                office=None,
+                total_production=3_000_000,
+                total_transactions_count=20,
+                tenure=datetime.timedelta(days=10 * 365),
+            ),
+        ]
+
+        scores = Agent.objects.get_scores()
+
+        for agent in agents:
+            self.assertAlmostEqual(
+                scores[agent.id]["sales_volume_score"], agent.sales_volume_score
+            )
+            self.assertAlmostEqual(
+                scores[agent.id]["transaction_count_score"],
+                agent.transaction_count_score,
+            )
+            self.assertAlmostEqual(scores[agent.id]["tenure_score"], agent.tenure_score)
+            self.assertAlmostEqual(
+                scores[agent.id]["office_size_score"],
+                agent.get_office_size_score()[0],
+            )
+
+    def test_cached_stats_leave_likelihood_to_move_alone(self):
+        agent = self.make_agent(likelihood_to_move=42)
+
+        Agent.objects.filter(id=agent.id).update_cached_stats()
+
+        agent.refresh_from_db()
+        self.assertEqual(agent.likelihood_to_move, 42)
+
     @patch("smartsetter_utils.ssot.models.abstract_agent.run_task_in_transaction")
     def test_runs_submit_to_clay_webhook_task(self, mock_run_task):
         self.make_agent()
@@ -118,6 +206,85 @@ class TestAgentModel(TestCase):
         mls.refresh_agent_materialized_view()
         self.assertEqual(Agent.objects.filter_by_mls_materialized_view(mls).count(), 1)
 
+    def test_materialized_view_refreshes_with_and_without_concurrently(self):
+        mls = self.make_mls(source=MLS.SOURCE_CHOICES.reality, table_name="SAVANNAH GA")
+        self.make_agent(mls=mls, status="Active")
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT indexdef FROM pg_indexes WHERE tablename = %s",
+                [mls.agent_materialized_view_table_name],
+            )
+            index_definitions = [row[0] for row in cursor.fetchall()]
+        self.assertTrue(
+            any(
+                "UNIQUE INDEX" in index_definition and index_definition.endswith("(id)")
+                for index_definition in index_definitions
+            )
+        )
+        mls.refresh_agent_materialized_view()
+        self.assertEqual(Agent.objects.filter_by_mls_materialized_view(mls).count(), 1)
+        Agent.objects.update(mls=None)
+        mls.refresh_agent_materialized_view(concurrently=False)
+        self.assertEqual(Agent.objects.filter_by_mls_materialized_view(mls).count(), 0)
+
+    def test_sync_materialized_view_indexes(self):
+        mls = self.make_mls(source=MLS.SOURCE_CHOICES.reality, table_name="SAVANNAH GA")
+        view_table_name = mls.agent_materialized_view_table_name
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP INDEX {view_table_name}_city")
+            cursor.execute(
+                f"CREATE INDEX {view_table_name}_extra ON {view_table_name} (email)"
+            )
+
+        MLS.objects.filter(id=mls.id).sync_agent_materialized_view_indexes()
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT indexname FROM pg_indexes WHERE tablename = %s",
+                [view_table_name],
+            )
+            index_names = {row[0] for row in cursor.fetchall()}
+        self.assertEqual(
+            index_names,
+            {
+                f"{view_table_name}_{name}"
+                for name in ["id", *MLS.AGENT_MATERIALIZED_VIEW_INDEXES]
+            },
+        )
+
+    def test_syncing_indexes_skips_mlss_without_a_view(self):
+        mls = MLS.objects.bulk_create(
+            [
+                MLS(
+                    id="no-view",
+                    name="No view",
+                    source=MLS.SOURCE_CHOICES.reality,
+                    table_name="NO VIEW",
+                )
+            ]
+        )[0]
+
+        MLS.objects.filter(id=mls.id).sync_agent_materialized_view_indexes()
+
+        self.assertFalse(mls.agent_materialized_view_exists())
+
+    def test_long_materialized_view_index_names_stay_distinct(self):
+        mls = MLS(source=MLS.SOURCE_CHOICES.constellation, table_name="x" * 40)
+
+        index_names = {
+            mls.get_agent_materialized_view_index_name(name)
+            for name in MLS.AGENT_MATERIALIZED_VIEW_INDEXES
+        }
+
+        self.assertEqual(len(index_names), len(MLS.AGENT_MATERIALIZED_VIEW_INDEXES))
+        self.assertTrue(
+            all(
+                len(index_name) <= MLS.MAX_INDEX_NAME_LENGTH
+                for index_name in index_names
+            )
+        )
+
     def test_filter_by_mls_id_portal_filter(self):
         mls = self.make_mls(source=MLS.SOURCE_CHOICES.reality, table_name="SAVANNAH GA")
         self.make_agent(name="Test Candidate", mls=mls, status="Active")
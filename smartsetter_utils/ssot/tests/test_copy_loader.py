@@ -0,0 +1,27 @@
+from smartsetter_utils.ssot.copy_loader import StagingCopyLoader
+from smartsetter_utils.ssot.models import Office
+from smartsetter_utils.ssot.tests.base import TestCase
+
+
+class TestStagingCopyLoader(TestCase):
+    def test_copy_and_merge(self):
+        existing_office = self.make_office()
+        mls = self.make_mls()
+
+        with StagingCopyLoader(Office) as loader:
+            loader.copy(
+                [
+                    Office(id="office-1", name="First", address="", mls=mls),
+                    Office(id="office-2", name="Second", address=None),
+                ]
+            )
+            loader.copy([Office(id="office-2"), Office(id=existing_office.id)])
+            created_count = loader.merge()
+
+        self.assertEqual(created_count, 2)
+        self.assertEqual(loader.staged_count, 4)
+        first_office = Office.objects.get(id="office-1")
+        self.assertEqual(first_office.address, "")
+        self.assertEqual(first_office.mls, mls)
+        self.assertIsNotNone(first_office.created)
+        self.assertIsNone(Office.objects.get(id="office-2").address)
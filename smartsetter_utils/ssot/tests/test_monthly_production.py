@@ -0,0 +1,88 @@
+import datetime
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from smartsetter_utils.ssot.models import (
+    Agent,
+    AgentMonthlyProduction,
+    Office,
+    OfficeMonthlyProduction,
+    Transaction,
+)
+from smartsetter_utils.ssot.tests.base import TestCase
+
+
+class TestMonthlyProduction(TestCase):
+    def test_rebuild_groups_transactions_by_role_and_month(self):
+        agent = self.make_agent()
+        self.make_transaction(
+            listing_agent=agent, closed_date=datetime.date(2026, 3, 5), sold_price=100
+        )
+        self.make_transaction(
+            listing_agent=agent, closed_date=datetime.date(2026, 3, 20), sold_price=50
+        )
+        self.make_transaction(
+            coselling_agent=agent, closed_date=datetime.date(2026, 4, 1), sold_price=10
+        )
+        self.make_transaction(listing_agent=agent, closed_date=None, sold_price=None)
+        AgentMonthlyProduction.objects.create(
+            agent=agent, role="selling", month=datetime.date(2020, 1, 1)
+        )
+
+        AgentMonthlyProduction.rebuild(Agent.objects.filter(id=agent.id))
+
+        self.assertEqual(
+            set(
+                agent.monthly_production.values_list(
+                    "role", "month", "transactions_count", "production"
+                )
+            ),
+            {
+                ("listing", datetime.date(2026, 3, 1), 2, 150),
+                ("coselling", datetime.date(2026, 4, 1), 1, 10),
+                ("listing", None, 1, 0),
+            },
+        )
+
+    def test_stats_add_partial_start_month_from_transactions(self):
+        office = self.make_office()
+        for closed_date, sold_price in (
+            (datetime.date(2025, 10, 14), 1),
+            (datetime.date(2025, 10, 15), 10),
+            (datetime.date(2025, 11, 1), 100),
+            (None, 1000),
+        ):
+            self.make_transaction(
+                listing_office=office, closed_date=closed_date, sold_price=sold_price
+            )
+        self.make_transaction(
+            selling_office=office, closed_date=datetime.date(2026, 1, 1), sold_price=5
+        )
+        OfficeMonthlyProduction.rebuild(Office.objects.filter(id=office.id))
+
+        stats = OfficeMonthlyProduction.get_stats(
+            office.id, datetime.date(2025, 10, 15)
+        )
+        all_time_stats = OfficeMonthlyProduction.get_stats(office.id)
+
+        self.assertEqual(stats["listing"], {"count": 2, "production": 110})
+        self.assertEqual(stats["selling"], {"count": 1, "production": 5})
+        self.assertEqual(stats["colisting"], {"count": 0, "production": 0})
+        self.assertEqual(all_time_stats["listing"], {"count": 4, "production": 1111})
+
+    def test_partial_start_month_only_reads_owner_transactions(self):
+        office = self.make_office()
+
+        with CaptureQueriesContext(connection) as queries:
+            OfficeMonthlyProduction.get_stats(office.id, datetime.date(2025, 10, 15))
+
+        transaction_sql = next(
+            query["sql"]
+            for query in queries
+            if f'FROM "{Transaction._meta.db_table}"' in query["sql"]
+        )
+        # past the FILTER (WHERE ...) clauses of the aggregates
+        where_clause = transaction_sql.split(" FROM ", 1)[1]
+        for field_name in OfficeMonthlyProduction.role_fields.values():
+            self.assertIn(f'"{field_name}_id"', where_clause)
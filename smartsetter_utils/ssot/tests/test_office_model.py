@@ -1,15 +1,15 @@
+import datetime
 import json
 from unittest.mock import patch
 
-from django.contrib.gis.geos import Point
+from django.utils import timezone
 
 from smartsetter_utils.ssot.models import Office
 from smartsetter_utils.ssot.tests.base import TestCase
 
 
 class TestOfficeModel(TestCase):
-    @patch("smartsetter_utils.ssot.tasks.handle_before_office_created")
-    def test_import_from_reality_data(self, _1):
+    def test_import_from_reality_data(self):
         office_data = self.get_office_data()
         mls = self.make_mls(id=office_data["MLSID"])
 
@@ -18,8 +18,7 @@ class TestOfficeModel(TestCase):
 
         self.assertTrue(Office.objects.get(office_id=office_data["OfficeID"], mls=mls))
 
-    @patch("smartsetter_utils.ssot.tasks.handle_before_office_created")
-    def test_updates_brand_name_in_office_name(self, _1):
+    def test_updates_brand_name_in_office_name(self):
         self.make_brand()
         office_data = self.get_office_data()
         office_data["Office"] = "re-max Reality Stuff re-max"
@@ -31,15 +30,89 @@ class TestOfficeModel(TestCase):
         # works only when tested independently like with --lf flag
         self.assertEqual(office.name, "RE/MAX Reality Stuff RE/MAX")
 
-    @patch("smartsetter_utils.ssot.tasks.get_location_from_zipcode_or_address")
-    def test_before_create_signal_handler(self, mock_get_location):
-        location = Point(0, 0)
-        mock_get_location.return_value = location
+    def test_bulk_upsert_only_updates_given_fields(self):
+        office = self.make_office(name="Old Name", hubspot_id="123")
 
-        office = Office.objects.create(id="whatever")
+        Office.objects.bulk_upsert(
+            [Office(id=office.id, name="New Name", city="New City")], ["name"]
+        )
 
+        office_city = office.city
         office.refresh_from_db()
-        self.assertEqual(office.location, location)
+        self.assertEqual(office.name, "New Name")
+        self.assertEqual(office.city, office_city)
+        self.assertEqual(office.hubspot_id, "123")
+
+    @patch("smartsetter_utils.ssot.models.office.Office.update_hubspot_properties")
+    def test_bulk_upserted_syncs_changed_offices_to_hubspot(
+        self, mock_update_hubspot_properties
+    ):
+        office = self.make_office(name="Old Name", hubspot_id="123")
+        unchanged_office = self.make_office(hubspot_id="456")
+        upserted_offices = [
+            Office(id=office.id, name="New Name"),
+            Office(id=unchanged_office.id, name=unchanged_office.name),
+        ]
+
+        Office.handle_bulk_upserted(
+            Office.objects.in_bulk([office.id, unchanged_office.id]),
+            upserted_offices,
+            ["name"],
+        )
+
+        mock_update_hubspot_properties.assert_called_once()
+        self.assertEqual(
+            mock_update_hubspot_properties.call_args.args[0]["name"], "New Name"
+        )
+
+    def test_bulk_create_bisecting_isolates_bad_rows(self):
+        existing_office = self.make_office()
+        new_offices = [Office(id=f"new-office-{index}") for index in range(5)]
+
+        created, failed = Office.objects.bulk_create_bisecting(
+            [*new_offices[:2], Office(id=existing_office.id), *new_offices[2:]]
+        )
+
+        self.assertEqual(created, new_offices)
+        self.assertEqual(len(failed), 1)
+        self.assertEqual(failed[0][0].id, existing_office.id)
+        self.assertEqual(Office.objects.count(), 6)
+
+    def test_update_cached_stats(self):
+        office = self.make_office()
+        other_office = self.make_office(agents_count=3)
+        self.make_agent(office=office)
+        self.make_agent(office=office)
+        self.make_transaction(
+            listing_office=office, closed_date=timezone.localdate(), sold_price=100
+        )
+        self.make_transaction(
+            selling_office=office,
+            closed_date=timezone.localdate() - datetime.timedelta(days=400),
+            sold_price=50,
+        )
+        self.make_transaction(listing_office=office, closed_date=None, sold_price=10)
+
+        Office.objects.filter(id=office.id).update_cached_stats()
+
+        office.refresh_from_db()
+        other_office.refresh_from_db()
+        self.assertEqual(
+            office.get_hubspot_stats_dict(),
+            {
+                "sales_volume__12m_": 100,
+                "sales_listing_volume__12m_": 100,
+                "sales_buying_volume__12m_": 0,
+                "sales_listing_count__12m_": 1,
+                "sales_buying_count__12m_": 0,
+                "sales_volume__all_time_": 160,
+                "sales_count__all_time_": 3,
+            },
+        )
+        self.assertEqual(
+            office.get_hubspot_employee_count_dict(), {"numberofemployees": 2}
+        )
+        self.assertEqual(other_office.agents_count, 3)
 
     def get_office_data(self):
         return json.loads(self.read_test_file("ssot", "reality_office.json"))
@@ -0,0 +1,40 @@
+from smartsetter_utils.ssot.pipeline import IngestPipeline
+from smartsetter_utils.ssot.tests.base import TestCase
+
+
+class TestIngestPipeline(TestCase):
+    def test_writes_transformed_batches_in_order(self):
+        written = []
+
+        IngestPipeline(
+            lambda: iter([[1, 2], [3], [4, 5]]),
+            lambda batch: [item * 10 for item in batch],
+            written.append,
+            queue_size=1,
+        ).run()
+
+        self.assertEqual(written, [[10, 20], [30], [40, 50]])
+
+    def test_raises_reader_errors(self):
+        def read():
+            yield [1]
+            raise ValueError("lost connection")
+
+        with self.assertRaisesMessage(ValueError, "lost connection"):
+            IngestPipeline(read, lambda batch: batch, lambda batch: None).run()
+
+    def test_stops_reading_when_writer_fails(self):
+        read_batches = []
+
+        def read():
+            for index in range(100):
+                read_batches.append(index)
+                yield [index]
+
+        def write(batch):
+            raise ValueError("constraint violated")
+
+        with self.assertRaisesMessage(ValueError, "constraint violated"):
+            IngestPipeline(read, lambda batch: batch, write, queue_size=1).run()
+
+        self.assertLess(len(read_batches), 100)
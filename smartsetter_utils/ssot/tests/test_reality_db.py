@@ -0,0 +1,160 @@
+from unittest.mock import patch
+
+import pymysql.err
+from django.test import override_settings
+
+from smartsetter_utils.ssot.reality_db import (
+    CircuitBreaker,
+    RealityDBConnectionPool,
+    RealityDBUnavailable,
+    connect,
+    guarded_cursor_execute,
+)
+from smartsetter_utils.ssot.tests.base import TestCase
+
+
+class TestRealityDBConnectionPool(TestCase):
+    @patch("smartsetter_utils.ssot.reality_db.connect")
+    def test_reuses_pinged_connections(self, mock_connect):
+        pool = RealityDBConnectionPool(size=1)
+
+        with pool.connection() as connection:
+            pass
+        with pool.connection() as reused_connection:
+            pass
+
+        self.assertIs(reused_connection, connection)
+        self.assertEqual(mock_connect.call_count, 1)
+        connection.ping.assert_called_once_with(reconnect=True)
+
+    @patch("smartsetter_utils.ssot.reality_db.connect")
+    def test_closes_connections_that_failed(self, mock_connect):
+        pool = RealityDBConnectionPool(size=1)
+
+        with self.assertRaises(ValueError):
+            with pool.connection() as connection:
+                raise ValueError
+
+        connection.close.assert_called_once()
+        with pool.connection():
+            pass
+        self.assertEqual(mock_connect.call_count, 2)
+
+    @patch("smartsetter_utils.ssot.reality_db.connect")
+    def test_fails_fast_while_circuit_is_open(self, mock_connect):
+        mock_connect.side_effect = pymysql.err.OperationalError
+        pool = RealityDBConnectionPool(
+            circuit_breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        )
+
+        for _ in range(2):
+            with self.assertRaises(pymysql.err.OperationalError):
+                pool.acquire()
+        with self.assertRaises(RealityDBUnavailable):
+            pool.acquire()
+
+        self.assertEqual(mock_connect.call_count, 2)
+
+    def test_circuit_lets_a_call_through_after_timeout(self):
+        circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+
+        with patch("smartsetter_utils.ssot.reality_db.time.monotonic") as monotonic:
+            monotonic.return_value = 100
+            circuit_breaker.record_failure()
+            self.assertTrue(circuit_breaker.is_open)
+
+            monotonic.return_value = 161
+            self.assertFalse(circuit_breaker.is_open)
+
+    def test_circuit_lets_a_single_trial_call_through(self):
+        circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+
+        with patch("smartsetter_utils.ssot.reality_db.time.monotonic") as monotonic:
+            monotonic.return_value = 100
+            circuit_breaker.record_failure()
+
+            monotonic.return_value = 161
+            circuit_breaker.check()
+            with self.assertRaises(RealityDBUnavailable):
+                circuit_breaker.check()
+
+            circuit_breaker.record_success()
+            circuit_breaker.check()
+            circuit_breaker.check()
+
+    @override_settings(
+        REALITY_DB_HOST="reality",
+        REALITY_DB_USER="user",
+        REALITY_DB_PASSWORD="password",
+        REALITY_DB_NAME="reality",
+        REALITY_DB_NET_TIMEOUT=7200,
+    )
+    @patch("smartsetter_utils.ssot.reality_db.pymysql.connect")
+    def test_raises_net_timeouts_for_streamed_results(self, mock_connect):
+        connect()
+
+        self.assertEqual(
+            mock_connect.call_args.kwargs["init_command"],
+            "SET SESSION net_write_timeout = 7200, net_read_timeout = 7200",
+        )
+
+
+class TestGuardedCursorExecute(TestCase):
+    @patch(
+        "smartsetter_utils.ssot.reality_db.random.uniform",
+        side_effect=lambda low, high: high,
+    )
+    @patch("smartsetter_utils.ssot.reality_db.time.sleep")
+    @patch(
+        "smartsetter_utils.ssot.reality_db.get_pool",
+        lambda: RealityDBConnectionPool(
+            circuit_breaker=CircuitBreaker(failure_threshold=10)
+        ),
+    )
+    def test_gives_up_after_jittered_backoff(self, mock_sleep, mock_uniform):
+        cursor = self.mock_with_attributes()
+        cursor.execute.side_effect = pymysql.err.OperationalError
+
+        with self.assertRaises(pymysql.err.OperationalError):
+            guarded_cursor_execute(cursor, "SELECT 1", max_attempts=3)
+
+        self.assertEqual(cursor.execute.call_count, 3)
+        self.assertEqual([call.args[0] for call in mock_sleep.call_args_list], [5, 10])
+        self.assertEqual(
+            [call.args for call in mock_uniform.call_args_list], [(0, 5), (0, 10)]
+        )
+
+    @patch("smartsetter_utils.ssot.reality_db.time.sleep")
+    @patch(
+        "smartsetter_utils.ssot.reality_db.get_pool",
+        lambda: RealityDBConnectionPool(
+            circuit_breaker=CircuitBreaker(failure_threshold=10)
+        ),
+    )
+    def test_retries_failed_reconnects(self, mock_sleep):
+        cursor = self.mock_with_attributes()
+        cursor.execute.side_effect = [pymysql.err.OperationalError, None]
+        cursor.connection.ping.side_effect = [pymysql.err.OperationalError, None]
+
+        guarded_cursor_execute(cursor, "SELECT 1", max_attempts=3)
+
+        self.assertEqual(cursor.connection.ping.call_count, 2)
+        self.assertEqual(cursor.execute.call_count, 2)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    @patch("smartsetter_utils.ssot.reality_db.time.sleep")
+    @patch(
+        "smartsetter_utils.ssot.reality_db.get_pool",
+        lambda: RealityDBConnectionPool(
+            circuit_breaker=CircuitBreaker(failure_threshold=1)
+        ),
+    )
+    def test_stops_retrying_once_circuit_opens(self, mock_sleep):
+        cursor = self.mock_with_attributes()
+        cursor.execute.side_effect = pymysql.err.OperationalError
+
+        with self.assertRaises(pymysql.err.OperationalError):
+            guarded_cursor_execute(cursor, "SELECT 1")
+
+        self.assertEqual(cursor.execute.call_count, 1)
+        mock_sleep.assert_not_called()
@@ -0,0 +1,107 @@
+from smartsetter_utils.ssot.models import Office
+from smartsetter_utils.ssot.reality_db import RealityDBConnectionPool, override_pool
+from smartsetter_utils.ssot.synthetic import (
+    SQLiteStandInConnection,
+    change_reality_rows,
+    generate_reality_rows,
+    load_reality_rows,
+)
+from smartsetter_utils.ssot.tasks import (
+    ModelClassMapper,
+    get_reality_select_statement,
+    iterate_all_create_in_batches,
+)
+from smartsetter_utils.ssot.tests.base import TestCase
+
+
+class TestSyntheticRealityRows(TestCase):
+    def test_generates_related_rows(self):
+        rows_by_table = generate_reality_rows(
+            offices=5, agents=20, transactions=50, mls_ids=(1, 2), seed=0
+        )
+
+        office_keys = {
+            (row["MLSID"], row["OfficeID"]) for row in rows_by_table["tblOffices"]
+        }
+        agent_keys = {
+            (row["MLSID"], row["AgentID"]) for row in rows_by_table["tblAgents"]
+        }
+        self.assertEqual(len(office_keys), 5)
+        self.assertTrue(
+            all(
+                (row["MLSID"], row["OfficeID"]) in office_keys
+                for row in rows_by_table["tblAgents"]
+            )
+        )
+        self.assertTrue(
+            all(
+                (row["MLSID"], row["LAID"]) in agent_keys
+                for row in rows_by_table["tblTransactions"]
+            )
+        )
+
+    def test_duplicates_and_bad_data(self):
+        rows_by_table = generate_reality_rows(
+            offices=1000,
+            agents=0,
+            transactions=0,
+            duplicate_rate=0.1,
+            bad_data_rate=0.1,
+            seed=0,
+        )
+
+        office_rows = rows_by_table["tblOffices"]
+        self.assertAlmostEqual(len(office_rows), 1100, delta=50)
+        bad_office_count = sum(row["Office"] == row["Address"] for row in office_rows)
+        self.assertAlmostEqual(bad_office_count, 110, delta=50)
+
+    def test_changes_agents_and_transactions(self):
+        rows_by_table = generate_reality_rows(
+            offices=10, agents=100, transactions=100, seed=0
+        )
+
+        changed_rows_by_table = change_reality_rows(rows_by_table, 0.5, seed=0)
+
+        self.assertEqual(
+            changed_rows_by_table["tblOffices"], rows_by_table["tblOffices"]
+        )
+        self.assertNotEqual(
+            changed_rows_by_table["tblAgents"], rows_by_table["tblAgents"]
+        )
+
+
+class TestSQLiteStandIn(TestCase):
+    def setUp(self):
+        self.rows_by_table = generate_reality_rows(
+            offices=10, agents=10, transactions=10, mls_ids=(140,), seed=0
+        )
+        self.connection = SQLiteStandInConnection(":memory:")
+        load_reality_rows(self.connection, self.rows_by_table)
+
+    def test_runs_ingest_statements(self):
+        statement, args = get_reality_select_statement(
+            Office, mls_id=140, after_key=["O0000004"], ordered=True
+        )
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(statement, args)
+            rows = cursor.fetchmany(100)
+
+        self.assertEqual(
+            [row["OfficeID"] for row in rows],
+            [f"O{index:07d}" for index in range(5, 10)],
+        )
+
+    def test_feeds_the_ingest(self):
+        self.make_mls(id="140")
+
+        with override_pool(RealityDBConnectionPool(connect=lambda: self.connection)):
+            counts = iterate_all_create_in_batches(
+                ModelClassMapper.office_id, mls_id=140, pipelined=False
+            )
+
+        bad_office_count = sum(
+            row["Office"] == row["Address"] for row in self.rows_by_table["tblOffices"]
+        )
+        self.assertEqual(counts["created"], 10 - bad_office_count)
+        self.assertEqual(Office.objects.filter(mls_id="140").count(), counts["created"])
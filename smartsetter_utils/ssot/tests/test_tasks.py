@@ -0,0 +1,666 @@
+import datetime
+import functools
+from unittest.mock import patch
+
+import pymysql.cursors
+import pymysql.err
+from celery import current_app
+from django.contrib.gis.geos import Point
+from django.test import override_settings
+from django.utils import timezone
+
+from smartsetter_utils.ssot.models import (
+    MLS,
+    Agent,
+    AgentMaterializedViewRefresh,
+    DirtyAgent,
+    DirtyMLS,
+    DirtyOffice,
+    IngestRun,
+    Office,
+    RealityTableWatermark,
+    Transaction,
+    ZipcodeLocation,
+)
+from smartsetter_utils.ssot.models.transaction import get_12m_start_date
+from smartsetter_utils.ssot.reality_db import RealityDBConnectionPool, override_pool
+from smartsetter_utils.ssot.synthetic import (
+    SQLiteStandInConnection,
+    generate_reality_rows,
+    load_reality_rows,
+)
+from smartsetter_utils.ssot.tasks import (
+    ModelClassMapper,
+    deduplicate_reality_dicts,
+    dispatch_reality_db_shards,
+    fetch_in_batches,
+    geocode_missing_locations,
+    get_reality_select_statement,
+    handle_agent_created,
+    ingest_reality_db_shard,
+    iterate_all_create_in_batches,
+    refresh_agent_materialized_view,
+    refresh_stale_agent_materialized_views,
+    roll_off_agent_cached_stats,
+    run_reality_db_shard,
+    update_dirty_agent_cached_stats,
+    upsert_reality_instances,
+)
+from smartsetter_utils.ssot.tests.base import TestCase
+from smartsetter_utils.ssot.tests.factories import AgentFactory
+
+
+@override_settings(REALITY_DB_WATERMARK_FIELDS={"tblOffices": "ModifiedDate"})
+class TestRealityTableWatermark(TestCase):
+    def test_full_scan_without_watermark(self):
+        statement, args = get_reality_select_statement(Office)
+
+        self.assertTrue(statement.endswith("FROM tblOffices"))
+        self.assertIsNone(args)
+
+    def test_delta_scan_from_stored_watermark(self):
+        RealityTableWatermark.advance_for_model(
+            Office, datetime.datetime(2026, 1, 1, 10, 30)
+        )
+
+        statement, args = get_reality_select_statement(
+            Office, RealityTableWatermark.get_value_for_model(Office)
+        )
+
+        self.assertTrue(statement.endswith("FROM tblOffices WHERE ModifiedDate >= %s"))
+        self.assertEqual(args, ["2026-01-01 10:30:00"])
+
+    def test_sharded_delta_scan(self):
+        RealityTableWatermark.advance_for_model(Office, 10, shard="140")
+
+        statement, args = get_reality_select_statement(
+            Office, RealityTableWatermark.get_value_for_model(Office, "140"), 140
+        )
+
+        self.assertTrue(
+            statement.endswith(
+                "FROM tblOffices WHERE MLSID = %s AND ModifiedDate >= %s"
+            )
+        )
+        self.assertEqual(args, [140, "10"])
+        self.assertIsNone(RealityTableWatermark.get_value_for_model(Office))
+
+    def test_watermark_ignored_when_field_changes(self):
+        RealityTableWatermark.advance_for_model(Office, 10)
+
+        with override_settings(REALITY_DB_WATERMARK_FIELDS={"tblOffices": "RowID"}):
+            self.assertIsNone(RealityTableWatermark.get_value_for_model(Office))
+
+
+class TestRealitySelectPushdown(TestCase):
+    def test_selects_only_source_fields(self):
+        statement, _ = get_reality_select_statement(Office)
+
+        self.assertEqual(
+            statement,
+            "SELECT MLSID, OfficeID, Office, Address, City, PostalCode, Phone, State "
+            "FROM tblOffices",
+        )
+
+    def test_filters_out_invisible_mlss(self):
+        self.make_mls(id="140", visible=False)
+        self.make_mls(id="141")
+
+        statement, args = get_reality_select_statement(Office)
+
+        self.assertTrue(statement.endswith("FROM tblOffices WHERE MLSID NOT IN (%s)"))
+        self.assertEqual(args, ["140"])
+
+    def test_filters_out_transactions_after_data_available_until(self):
+        data_available_until = timezone.now()
+        self.make_mls(id="140", data_available_until=data_available_until)
+
+        statement, args = get_reality_select_statement(Transaction, mls_id=140)
+
+        self.assertTrue(
+            statement.endswith(
+                "FROM tblTransactions WHERE MLSID = %s "
+                "AND NOT (MLSID = %s AND ClosedDate > %s)"
+            )
+        )
+        self.assertEqual(args, [140, "140", data_available_until])
+
+
+class TestStreamedCreate(TestCase):
+    def test_streams_rows_in_batches_through_unbuffered_cursor(self):
+        self.make_mls(id="140")
+        connection = SQLiteStandInConnection(":memory:")
+        load_reality_rows(
+            connection,
+            generate_reality_rows(
+                offices=2500, agents=0, transactions=0, mls_ids=(140,), seed=0
+            ),
+        )
+
+        with (
+            patch.object(connection, "cursor", wraps=connection.cursor) as mock_cursor,
+            override_pool(RealityDBConnectionPool(connect=lambda: connection)),
+        ):
+            counts = iterate_all_create_in_batches(
+                ModelClassMapper.office_id, mls_id=140, pipelined=False
+            )
+
+        mock_cursor.assert_called_once_with(pymysql.cursors.SSDictCursor)
+        self.assertEqual(counts["created"], 2500)
+        self.assertEqual(Office.objects.filter(mls_id="140").count(), 2500)
+
+
+class TestUpsertRealityInstances(TestCase):
+    @patch("smartsetter_utils.ssot.models.office.Office.handle_bulk_upserted")
+    def test_skips_rows_with_unchanged_hash(self, mock_handle_bulk_upserted):
+        unchanged_office = self.make_office(name="Same", source_hash="same-hash")
+        changed_office = self.make_office(name="Old", source_hash="old-hash")
+
+        upsert_reality_instances(
+            Office,
+            [
+                Office(id=unchanged_office.id, name="Same", source_hash="same-hash"),
+                Office(id=changed_office.id, name="New", source_hash="new-hash"),
+            ],
+            ["name", "source_hash", "modified"],
+        )
+
+        unchanged_modified = unchanged_office.modified
+        unchanged_office.refresh_from_db()
+        changed_office.refresh_from_db()
+        self.assertEqual(unchanged_office.modified, unchanged_modified)
+        self.assertEqual(changed_office.name, "New")
+        self.assertEqual(changed_office.source_hash, "new-hash")
+        upserted_offices = mock_handle_bulk_upserted.call_args.args[1]
+        self.assertEqual(
+            [office.id for office in upserted_offices], [changed_office.id]
+        )
+
+    @patch("smartsetter_utils.ssot.models.transaction.Transaction.save")
+    def test_bulk_creates_rows_without_creation_hooks(self, mock_save):
+        upsert_reality_instances(
+            Transaction,
+            [Transaction(id="new__140", mls_number="new", source_hash="hash")],
+            ["mls_number", "source_hash", "modified"],
+        )
+
+        mock_save.assert_not_called()
+        self.assertTrue(Transaction.objects.filter(id="new__140").exists())
+
+
+class TestIngestCheckpoints(TestCase):
+    def test_resumes_after_checkpoint_key(self):
+        statement, args = get_reality_select_statement(
+            Transaction, mls_id=140, after_key=["00-50120971"], ordered=True
+        )
+
+        self.assertTrue(
+            statement.endswith(
+                "FROM tblTransactions WHERE MLSID = %s AND (MLSNumber) > (%s) "
+                "ORDER BY MLSNumber"
+            )
+        )
+        self.assertEqual(args, [140, "00-50120971"])
+
+    def test_unsharded_key_includes_mlsid(self):
+        statement, args = get_reality_select_statement(
+            Agent, after_key=[140, "AGENT1"], ordered=True
+        )
+
+        self.assertTrue(
+            statement.endswith(
+                "FROM tblAgents WHERE (MLSID, AgentID) > (%s, %s) "
+                "ORDER BY MLSID, AgentID"
+            )
+        )
+        self.assertEqual(args, [140, "AGENT1"])
+
+    def test_resumes_after_batch_ending_inside_duplicate_key(self):
+        self.make_mls(id="140")
+        rows_by_table = generate_reality_rows(
+            offices=3, agents=0, transactions=0, mls_ids=(140,), seed=0
+        )
+        office_rows = sorted(
+            rows_by_table["tblOffices"], key=lambda row: row["OfficeID"]
+        )
+        newer_row = {
+            **office_rows[1],
+            "City": "Newer City",
+            "ModifiedDate": office_rows[1]["ModifiedDate"] + datetime.timedelta(1),
+        }
+        # the first batch of 2 ends between the two rows of the middle office
+        rows_by_table["tblOffices"] = [*office_rows[:2], newer_row, office_rows[2]]
+        connection = SQLiteStandInConnection(":memory:")
+        load_reality_rows(connection, rows_by_table)
+        run = IngestRun.objects.create(kind=IngestRun.KIND_CHOICES.create)
+        bulk_create_bisecting = Office.objects.bulk_create_bisecting
+        write_count = 0
+
+        def fail_after_first_batch(instances):
+            nonlocal write_count
+            write_count += 1
+            if write_count > 1:
+                raise RuntimeError
+            return bulk_create_bisecting(instances)
+
+        with (
+            override_pool(RealityDBConnectionPool(connect=lambda: connection)),
+            patch(
+                "smartsetter_utils.ssot.tasks.fetch_in_batches",
+                functools.partial(fetch_in_batches, batch_size=2),
+            ),
+        ):
+            with (
+                patch.object(
+                    Office.objects,
+                    "bulk_create_bisecting",
+                    side_effect=fail_after_first_batch,
+                ),
+                self.assertRaises(RuntimeError),
+            ):
+                iterate_all_create_in_batches(
+                    ModelClassMapper.office_id,
+                    mls_id=140,
+                    pipelined=False,
+                    run_id=run.id,
+                )
+            self.assertEqual(
+                run.get_checkpoint(Office, "140").last_key,
+                [office_rows[0]["OfficeID"]],
+            )
+
+            iterate_all_create_in_batches(
+                ModelClassMapper.office_id, mls_id=140, pipelined=False, run_id=run.id
+            )
+
+        self.assertEqual(Office.objects.filter(mls_id="140").count(), 3)
+        office = Office.objects.get(id=Office.get_id_from_reality_dict(newer_row))
+        self.assertEqual(office.city, "Newer City")
+
+    def test_run_finishes_when_all_checkpoints_complete(self):
+        run = IngestRun.objects.create(
+            kind=IngestRun.KIND_CHOICES.pull, expected_checkpoint_count=2
+        )
+        run.get_checkpoint(Office).complete()
+        run.finish_if_completed()
+        self.assertIsNone(run.finished)
+
+        run.get_checkpoint(Agent).complete()
+        run.finish_if_completed()
+        self.assertIsNotNone(run.finished)
+
+
+class TestShardedIngest(TestCase):
+    def setUp(self):
+        self.run = IngestRun.objects.create(
+            kind=IngestRun.KIND_CHOICES.pull, sharded=True
+        )
+
+    @patch("smartsetter_utils.ssot.tasks.run_reality_db_shard")
+    @patch(
+        "smartsetter_utils.ssot.tasks.get_reality_mls_ids",
+        return_value=[140, 141, 142, 143, 144],
+    )
+    def test_lanes_go_on_past_failed_shards(self, mock_get_mls_ids, mock_run_shard):
+        def run_shard(run, mls_id):
+            if mls_id == 140:
+                raise ValueError
+
+        mock_run_shard.side_effect = run_shard
+        current_app.conf.task_always_eager = True
+        self.addCleanup(setattr, current_app.conf, "task_always_eager", False)
+
+        dispatch_reality_db_shards(self.run, concurrency=2)
+
+        # lanes are [140, 142, 144] and [141, 143]
+        self.assertEqual(
+            [call.args[1] for call in mock_run_shard.call_args_list],
+            [140, 142, 144, 141, 143],
+        )
+        self.run.refresh_from_db()
+        self.assertEqual(self.run.expected_checkpoint_count, 20)
+
+    @patch("smartsetter_utils.ssot.tasks.geocode_missing_locations")
+    @patch("smartsetter_utils.ssot.tasks.update_run_cached_stats")
+    @patch("smartsetter_utils.ssot.tasks.ingest_reality_db_tables")
+    def test_retry_reruns_post_ingest_stages_of_loaded_shard(
+        self, mock_ingest_tables, mock_update_stats, mock_geocode
+    ):
+        mock_update_stats.side_effect = [ValueError, None]
+
+        with self.assertRaises(ValueError):
+            run_reality_db_shard(self.run, 140)
+        run_reality_db_shard(self.run, 140)
+        run_reality_db_shard(self.run, 140)
+
+        self.assertEqual(mock_ingest_tables.call_count, 2)
+        self.assertEqual(mock_update_stats.call_count, 2)
+        self.assertTrue(self.run.get_post_ingest_checkpoint("140").completed)
+
+    @patch(
+        "smartsetter_utils.ssot.tasks.run_reality_db_shard",
+        side_effect=pymysql.err.OperationalError,
+    )
+    def test_retries_reality_db_errors_then_gives_up(self, mock_run_shard):
+        result = ingest_reality_db_shard.apply(args=(140, self.run.id))
+
+        self.assertTrue(result.successful())
+        self.assertEqual(mock_run_shard.call_count, 6)
+
+
+class TestDeduplicateRealityDicts(TestCase):
+    def test_last_row_wins_without_watermark(self):
+        reality_dicts = [
+            {"MLSID": 140, "OfficeID": "1", "Office": "Old"},
+            {"MLSID": 140, "OfficeID": "2", "Office": "Other"},
+            {"MLSID": 140, "OfficeID": "1", "Office": "New"},
+        ]
+
+        deduplicated, duplicate_count = deduplicate_reality_dicts(Office, reality_dicts)
+
+        self.assertEqual([row["Office"] for row in deduplicated], ["New", "Other"])
+        self.assertEqual(duplicate_count, 1)
+
+    @override_settings(REALITY_DB_WATERMARK_FIELDS={"tblOffices": "ModifiedDate"})
+    def test_newest_row_wins_with_watermark(self):
+        reality_dicts = [
+            {"MLSID": 140, "OfficeID": "1", "Office": "New", "ModifiedDate": 2},
+            {"MLSID": 140, "OfficeID": "1", "Office": "Old", "ModifiedDate": 1},
+        ]
+
+        deduplicated, duplicate_count = deduplicate_reality_dicts(Office, reality_dicts)
+
+        self.assertEqual([row["Office"] for row in deduplicated], ["New"])
+        self.assertEqual(duplicate_count, 1)
+
+    def test_checkpoints_sum_duplicates_per_run(self):
+        run = IngestRun.objects.create(kind=IngestRun.KIND_CHOICES.pull)
+
+        run.get_checkpoint(Office).advance(["1"], 2)
+        run.get_checkpoint(Office).advance(["2"], 1)
+        run.get_checkpoint(Agent).advance(["1"], 3)
+
+        self.assertEqual(run.get_duplicate_count(), 6)
+
+
+class TestGeocodeMissingLocations(TestCase):
+    @patch("smartsetter_utils.ssot.tasks.query_location_for_zipcode")
+    def test_looks_each_zipcode_up_once(self, mock_query_location):
+        location = Point(1, 1)
+        mock_query_location.side_effect = lambda zipcode: (
+            location if zipcode == "10001" else None
+        )
+        mls = self.make_mls()
+        office = self.make_office(mls=mls, zipcode="10001", location=None)
+        agent = self.make_agent(mls=mls, zipcode="10001", location=None)
+        transaction = self.make_transaction(mls=mls, zipcode="10001", location=None)
+        unknown_office = self.make_office(mls=mls, zipcode="99999", location=None)
+        other_mls_office = self.make_office(zipcode="10001", location=None)
+
+        geocode_missing_locations(mls.id)
+
+        self.assertEqual(
+            sorted(call.args[0] for call in mock_query_location.call_args_list),
+            ["10001", "99999"],
+        )
+        for instance in (office, agent, transaction):
+            instance.refresh_from_db()
+            self.assertEqual(instance.location, location)
+        unknown_office.refresh_from_db()
+        self.assertIsNone(unknown_office.location)
+        other_mls_office.refresh_from_db()
+        self.assertIsNone(other_mls_office.location)
+
+    @patch("smartsetter_utils.ssot.tasks.query_location_for_zipcode")
+    def test_does_not_look_unresolved_zipcodes_up_again(self, mock_query_location):
+        mock_query_location.return_value = None
+        mls = self.make_mls()
+        self.make_office(mls=mls, zipcode="99999", location=None)
+
+        geocode_missing_locations(mls.id)
+        geocode_missing_locations(mls.id)
+        self.assertEqual(mock_query_location.call_count, 1)
+
+        ZipcodeLocation.objects.filter(zipcode="99999").update(
+            modified=timezone.now() - ZipcodeLocation.RETRY_UNRESOLVED_AFTER
+        )
+        geocode_missing_locations(mls.id)
+        self.assertEqual(mock_query_location.call_count, 2)
+
+    @patch("smartsetter_utils.ssot.tasks.query_location_for_zipcode")
+    def test_uses_cached_locations(self, mock_query_location):
+        location = Point(1, 1)
+        ZipcodeLocation.objects.create(zipcode="10001", location=location)
+        mls = self.make_mls()
+        office = self.make_office(mls=mls, zipcode="10001", location=None)
+
+        geocode_missing_locations(mls.id)
+
+        mock_query_location.assert_not_called()
+        office.refresh_from_db()
+        self.assertEqual(office.location, location)
+
+    @patch("smartsetter_utils.ssot.tasks.query_location_for_zipcode")
+    def test_geocodes_only_the_given_row(self, mock_query_location):
+        location = Point(1, 1)
+        mock_query_location.return_value = location
+        office = self.make_office(zipcode="10001", location=None)
+        other_office = self.make_office(zipcode="10001", location=None)
+        agent = self.make_agent(zipcode="10001", location=None)
+
+        geocode_missing_locations(
+            model_class_id=ModelClassMapper.office_id, id=office.id
+        )
+
+        office.refresh_from_db()
+        self.assertEqual(office.location, location)
+        for instance in (other_office, agent):
+            instance.refresh_from_db()
+            self.assertIsNone(instance.location)
+
+    def test_creation_hooks_queue_geocoding(self):
+        with patch(
+            "smartsetter_utils.ssot.models.office.run_task_in_transaction"
+        ) as mock_run_task:
+            office = self.make_office(zipcode="10001", location=None)
+            self.make_office(zipcode="10001", location=Point(1, 1))
+        mock_run_task.assert_called_once_with(
+            geocode_missing_locations,
+            model_class_id=ModelClassMapper.office_id,
+            id=office.id,
+        )
+
+        with patch(
+            "smartsetter_utils.ssot.models.transaction.run_task_in_transaction"
+        ) as mock_run_task:
+            transaction = self.make_transaction(zipcode="10001", location=None)
+        mock_run_task.assert_called_once_with(
+            geocode_missing_locations,
+            model_class_id=ModelClassMapper.transaction_id,
+            id=transaction.id,
+        )
+
+    @patch("smartsetter_utils.ssot.tasks.query_location_for_zipcode")
+    def test_handle_agent_created_geocodes_the_agent(self, mock_query_location):
+        location = Point(1, 1)
+        mock_query_location.return_value = location
+        agent = self.make_agent(zipcode="10001", location=None)
+
+        handle_agent_created(agent.id)
+
+        agent.refresh_from_db()
+        self.assertEqual(agent.location, location)
+
+
+class TestDirtyAgents(TestCase):
+    def test_upsert_marks_previous_and_new_agents(self):
+        previous_agent = self.make_agent(total_transactions_count=1)
+        new_agent = self.make_agent(total_transactions_count=0)
+        untouched_agent = self.make_agent(total_transactions_count=5)
+        transaction = self.make_transaction(
+            listing_agent=previous_agent,
+            closed_date=timezone.localdate(),
+            source_hash="old-hash",
+        )
+        transaction.listing_agent = new_agent
+        transaction.source_hash = "new-hash"
+
+        upsert_reality_instances(
+            Transaction, [transaction], ["listing_agent", "source_hash"]
+        )
+
+        self.assertEqual(
+            set(DirtyAgent.objects.values_list("agent_id", flat=True)),
+            {previous_agent.id, new_agent.id},
+        )
+        update_dirty_agent_cached_stats()
+        previous_agent.refresh_from_db()
+        new_agent.refresh_from_db()
+        untouched_agent.refresh_from_db()
+        self.assertEqual(previous_agent.total_transactions_count, 0)
+        self.assertEqual(new_agent.total_transactions_count, 1)
+        self.assertEqual(untouched_agent.total_transactions_count, 5)
+        self.assertFalse(DirtyAgent.objects.exists())
+
+    def test_upsert_marks_agents_and_offices_of_created_transactions(self):
+        agent = self.make_agent()
+        office = self.make_office()
+
+        upsert_reality_instances(
+            Transaction,
+            [
+                Transaction(
+                    id="new__140",
+                    mls_number="new",
+                    selling_agent=agent,
+                    selling_office=office,
+                )
+            ],
+            ["selling_agent", "selling_office"],
+        )
+
+        self.assertEqual(
+            list(DirtyAgent.objects.values_list("agent_id", flat=True)), [agent.id]
+        )
+        self.assertEqual(
+            list(DirtyOffice.objects.values_list("office_id", flat=True)), [office.id]
+        )
+
+    def test_upsert_marks_created_agents_and_their_office(self):
+        office = self.make_office()
+        colleague = self.make_agent(office=office)
+        self.make_agent()
+        new_agent = AgentFactory.build(office=office)
+
+        upsert_reality_instances(Agent, [new_agent], ["office"])
+
+        self.assertEqual(
+            set(DirtyAgent.objects.values_list("agent_id", flat=True)),
+            {colleague.id, new_agent.id},
+        )
+        self.assertEqual(
+            list(DirtyOffice.objects.values_list("office_id", flat=True)), [office.id]
+        )
+
+    def test_upsert_marks_agents_of_offices_an_agent_moved_between(self):
+        previous_office = self.make_office()
+        new_office = self.make_office()
+        previous_colleague = self.make_agent(office=previous_office)
+        new_colleague = self.make_agent(office=new_office)
+        agent = self.make_agent(office=previous_office, source_hash="old-hash")
+        agent.office = new_office
+        agent.source_hash = "new-hash"
+
+        upsert_reality_instances(Agent, [agent], ["office", "source_hash"])
+
+        self.assertEqual(
+            set(DirtyAgent.objects.values_list("agent_id", flat=True)),
+            {previous_colleague.id, new_colleague.id, agent.id},
+        )
+        self.assertEqual(
+            set(DirtyOffice.objects.values_list("office_id", flat=True)),
+            {previous_office.id, new_office.id},
+        )
+
+    def test_sharded_pass_only_recomputes_its_mls(self):
+        agent = self.make_agent(mls=self.make_mls())
+        other_mls_agent = self.make_agent(mls=self.make_mls())
+        DirtyAgent.mark([agent.id, other_mls_agent.id])
+
+        update_dirty_agent_cached_stats(agent.mls_id)
+
+        self.assertEqual(
+            list(DirtyAgent.objects.values_list("agent_id", flat=True)),
+            [other_mls_agent.id],
+        )
+
+    def test_roll_off_recomputes_agents_leaving_the_window(self):
+        window_start_date = get_12m_start_date()
+        rolled_off_agent = self.make_agent(total_transactions_count=1)
+        self.make_transaction(
+            listing_agent=rolled_off_agent,
+            closed_date=window_start_date - datetime.timedelta(days=1),
+        )
+        older_agent = self.make_agent(total_transactions_count=1)
+        self.make_transaction(
+            listing_agent=older_agent,
+            closed_date=window_start_date - datetime.timedelta(days=2),
+        )
+
+        roll_off_agent_cached_stats()
+
+        rolled_off_agent.refresh_from_db()
+        older_agent.refresh_from_db()
+        self.assertEqual(rolled_off_agent.total_transactions_count, 0)
+        self.assertEqual(older_agent.total_transactions_count, 1)
+
+
+class TestAgentMaterializedViewRefresh(TestCase):
+    def test_agent_writes_mark_their_mls(self):
+        mls = self.make_mls()
+        agent = self.make_agent(mls=mls, source_hash="old-hash")
+        agent.source_hash = "new-hash"
+
+        upsert_reality_instances(Agent, [agent], ["source_hash"])
+
+        self.assertEqual(
+            list(DirtyMLS.objects.values_list("mls_id", flat=True)), [mls.id]
+        )
+
+    @patch("smartsetter_utils.ssot.tasks.apply_in_lanes")
+    def test_only_refreshes_stale_views(self, mock_apply_in_lanes):
+        self.make_mls()
+        stale_mls = self.make_mls()
+        DirtyMLS.mark([stale_mls.id])
+
+        refresh_stale_agent_materialized_views(concurrency=2)
+
+        signatures, concurrency = mock_apply_in_lanes.call_args.args
+        self.assertEqual(
+            [signature.args for signature in signatures], [(stale_mls.id,)]
+        )
+        self.assertEqual(concurrency, 2)
+
+    def test_records_refresh(self):
+        mls = self.make_mls(source=MLS.SOURCE_CHOICES.reality, table_name="SAVANNAH GA")
+        self.make_agent(mls=mls)
+        DirtyMLS.mark([mls.id])
+
+        refresh_agent_materialized_view(mls.id)
+
+        self.assertFalse(DirtyMLS.objects.exists())
+        refresh = AgentMaterializedViewRefresh.objects.get(mls=mls)
+        self.assertEqual(refresh.row_count, 1)
+
+    @patch(
+        "smartsetter_utils.ssot.models.mls.MLS.refresh_agent_materialized_view",
+        side_effect=ValueError,
+    )
+    def test_failed_refresh_stays_marked_without_raising(self, mock_refresh):
+        mls = self.make_mls(source=MLS.SOURCE_CHOICES.reality, table_name="SAVANNAH GA")
+        DirtyMLS.mark([mls.id])
+
+        refresh_agent_materialized_view(mls.id)
+
+        self.assertTrue(DirtyMLS.objects.filter(mls_id=mls.id).exists())
+        self.assertFalse(AgentMaterializedViewRefresh.objects.exists())
@@ -1,16 +1,14 @@
 import json
-from unittest.mock import patch
 
-from django.contrib.gis.geos import Point
 from django.utils import timezone
 
 from smartsetter_utils.ssot.models import Agent, Office, Transaction
+from smartsetter_utils.ssot.models.base_models import RealityForeignKeyResolver
 from smartsetter_utils.ssot.tests.base import TestCase
 
 
 class TestTransactionModel(TestCase):
-    @patch("smartsetter_utils.ssot.tasks.handle_before_transaction_created")
-    def test_import_from_reality_data(self, _1):
+    def test_import_from_reality_data(self):
         transaction_data = json.loads(
             self.read_test_file("ssot", "reality_transaction.json")
         )
@@ -40,12 +38,28 @@ class TestTransactionModel(TestCase):
             )
         )
 
-    @patch("smartsetter_utils.ssot.tasks.get_location_from_zipcode_or_address")
-    def test_handle_before_create_signal(self, mock_get_location):
-        location = Point(0, 0)
-        mock_get_location.return_value = location
+    def test_preloaded_fk_resolver_makes_no_queries(self):
+        transaction_data = json.loads(
+            self.read_test_file("ssot", "reality_transaction.json")
+        )
+        mls = self.make_mls(id=transaction_data["MLSID"])
+        agent = self.make_agent(
+            id=Agent.get_id_from_reality_dict(transaction_data, "SAID")
+        )
+        listing_office = self.make_office(
+            id=Office.get_id_from_reality_dict(transaction_data, "LOID")
+        )
+        fk_resolver = RealityForeignKeyResolver().preload(
+            Transaction, [transaction_data]
+        )
 
-        transaction = Transaction.objects.create(id="whatnever")
+        with self.assertNumQueries(0):
+            property_dict = Transaction.get_property_dict_from_reality_dict(
+                transaction_data, fk_resolver
+            )
 
-        transaction.refresh_from_db()
-        self.assertEqual(transaction.location, location)
+        self.assertEqual(property_dict["mls_id"], mls.id)
+        self.assertEqual(property_dict["listing_agent_id"], agent.id)
+        self.assertEqual(property_dict["selling_agent_id"], agent.id)
+        self.assertEqual(property_dict["listing_office_id"], listing_office.id)
+        self.assertIsNone(property_dict["selling_office_id"])
@@ -1,6 +1,10 @@
 from smartsetter_utils.ssot.models import Agent
 from smartsetter_utils.ssot.tests.base import TestCase
-from smartsetter_utils.ssot.utils import apply_filter_to_queryset
+from smartsetter_utils.ssot.utils import (
+    PhoneNormalizer,
+    SubstringMatcher,
+    apply_filter_to_queryset,
+)
 
 
 class TestApplyFilterToQuerySet(TestCase):
@@ -37,3 +41,43 @@ class TestApplyFilterToQuerySet(TestCase):
         self.make_agent(email="")
         self.make_agent(email=None)
         return agent_with_email
+
+
+class TestPhoneNormalizer(TestCase):
+    def test_normalizes_and_caches_phones(self):
+        phone_normalizer = PhoneNormalizer()
+
+        normalized_phones = phone_normalizer.normalize_many(
+            ["(305) 555-0134", "305 555 0134", "(305) 555-0134", "N/R", ""]
+        )
+
+        self.assertEqual(
+            normalized_phones,
+            ["+13055550134", "+13055550134", "+13055550134", None, None],
+        )
+        self.assertEqual(phone_normalizer.lookup_count, 5)
+        self.assertEqual(phone_normalizer.hit_ratio, 0.2)
+
+    def test_reset_stats_keeps_cache(self):
+        phone_normalizer = PhoneNormalizer()
+        phone_normalizer.normalize("(305) 555-0134")
+
+        phone_normalizer.reset_stats()
+        phone_normalizer.normalize("(305) 555-0134")
+
+        self.assertEqual(phone_normalizer.lookup_count, 1)
+        self.assertEqual(phone_normalizer.hit_ratio, 1.0)
+
+
+class TestSubstringMatcher(TestCase):
+    def test_matches_like_scanning_the_patterns(self):
+        patterns = ["agent assistant", "photographer"]
+        matcher = SubstringMatcher(patterns)
+
+        for value in ("Assistant", " photo ", "t a", "  ", "x", "agents", None, ""):
+            self.assertEqual(
+                matcher.matches(value),
+                bool(value)
+                and any(value.lower().strip() in pattern for pattern in patterns),
+                value,
+            )
@@ -1,3 +1,4 @@
+import functools
 import re
 
 import phonenumbers
@@ -7,6 +8,7 @@ from django.db.models import Q
 
 from smartsetter_utils.core import format_phone as utils_format_phone
 from smartsetter_utils.hubspot.utils import get_hubspot_client
+from smartsetter_utils.ssot.data import member_type_patterns, security_class_patterns
 
 
 def format_phone(phone):
@@ -18,6 +20,69 @@ def format_phone(phone):
         return None
 
 
+class PhoneNormalizer:
+    """
+    format_phone behind a bounded LRU cache, since the same office phones
+    repeat thousands of times in a Reality table. hit_ratio covers the
+    lookups since the last reset_stats(), which a run calls when it starts
+    """
+
+    def __init__(self, maxsize=2**16):
+        self.normalize = functools.lru_cache(maxsize=maxsize)(format_phone)
+        self.reset_stats()
+
+    def normalize_many(self, phones):
+        return [self.normalize(phone) for phone in phones]
+
+    def reset_stats(self):
+        self.stats_start = self.normalize.cache_info()
+
+    @property
+    def lookup_count(self):
+        cache_info = self.normalize.cache_info()
+        return (
+            cache_info.hits
+            + cache_info.misses
+            - self.stats_start.hits
+            - self.stats_start.misses
+        )
+
+    @property
+    def hit_ratio(self):
+        if not self.lookup_count:
+            return 0.0
+        return (
+            self.normalize.cache_info().hits - self.stats_start.hits
+        ) / self.lookup_count
+
+
+phone_normalizer = PhoneNormalizer()
+
+
+class SubstringMatcher:
+    """
+    Tells whether a value, lowercased and stripped, is a substring of any of
+    the patterns with one set lookup instead of a scan over them, by
+    indexing every substring of every pattern up front
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self.substrings = frozenset(
+            pattern[start:end]
+            for pattern in self.patterns
+            for start in range(len(pattern) + 1)
+            for end in range(start, len(pattern) + 1)
+        )
+
+    def matches(self, value):
+        return bool(value) and value.lower().strip() in self.substrings
+
+
+member_type_matcher = SubstringMatcher(member_type_patterns)
+security_class_matcher = SubstringMatcher(security_class_patterns)
+
+
 def get_reality_db_hubspot_client():
     return get_hubspot_client(settings.REALITY_DB_HUBSPOT_ACCESS_TOKEN)
 